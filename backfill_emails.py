@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Backfill Jobup offers from an mbox file or a directory of .eml files.
+
+Messages are parsed in a process pool with the same pyzmail decoding and
+``extract_offers_from_body`` logic as the IMAP reader, without any network
+access. Discovered offers are deduplicated on their canonical URL and
+streamed into the pipeline input:
+
+* by default they are enqueued as ``offer`` jobs in the work queue
+  (see ``run_pipeline.py --worker``);
+* with ``--scrape`` they are scraped right away like step 2 and exported to
+  ``offres_jobup.xlsx``;
+* with ``--offers-only FILE`` the raw offers are exported without scraping.
+
+Usage examples:
+  python backfill_emails.py Takeout/Mail/Jobup.mbox
+  python backfill_emails.py exports/eml/ --workers 8 --queue /mnt/shared/work_queue.sqlite3
+  python backfill_emails.py Jobup.mbox --scrape
+"""
+
+import argparse
+import glob
+import os
+import sys
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List
+
+from email_jobup_reader import OFFER_COLUMNS, OUTPUT_XLSX, SENDER_EMAIL, offers_from_message
+from work_queue import DEFAULT_QUEUE_PATH, WorkQueue
+
+BATCH_SIZE = 64
+SENDER_MARKER = SENDER_EMAIL.split("@", 1)[1].encode()
+
+
+def iter_raw_messages(source: str) -> Iterator[bytes]:
+    """Yield raw messages from an mbox file or a directory of .eml files."""
+    if os.path.isdir(source):
+        for path in sorted(glob.iglob(os.path.join(source, "**", "*.eml"), recursive=True)):
+            with open(path, "rb") as f:
+                yield f.read()
+        return
+    import mailbox
+
+    box = mailbox.mbox(source, create=False)
+    try:
+        for key in box.iterkeys():
+            yield box.get_bytes(key)
+    finally:
+        box.close()
+
+
+def is_candidate(raw: bytes) -> bool:
+    """Cheap pre-filter: keep messages whose headers mention the Jobup sender."""
+    end = raw.find(b"\n\n")
+    if end < 0:
+        end = raw.find(b"\r\n\r\n")
+    headers = raw if end < 0 else raw[:end]
+    return SENDER_MARKER in headers.lower()
+
+
+def parse_batch(batch: List[bytes]) -> tuple[List[Dict[str, str]], List[str]]:
+    """Worker entry point: offers found in a batch of raw messages.
+
+    Messages that cannot be parsed are skipped; their errors are returned
+    alongside the offers.
+    """
+    offers: List[Dict[str, str]] = []
+    errors: List[str] = []
+    for raw in batch:
+        try:
+            offers.extend(offers_from_message(raw))
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+    return offers, errors
+
+
+def _batches(raws: Iterable[bytes], size: int) -> Iterator[List[bytes]]:
+    batch: List[bytes] = []
+    for raw in raws:
+        if not is_candidate(raw):
+            continue
+        batch.append(raw)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_offers(
+    raws: Iterable[bytes],
+    executor: Executor,
+    batch_size: int = BATCH_SIZE,
+    max_pending: int = 16,
+) -> Iterator[Dict[str, str]]:
+    """Parse *raws* on *executor* and yield unique offers as they arrive.
+
+    At most ``max_pending`` batches are in flight, so memory stays bounded
+    however large the archive is. Unreadable messages are reported per batch
+    and counted in a final summary.
+    """
+    seen: set[str] = set()
+    pending: deque = deque()
+    batches = _batches(raws, batch_size)
+    unreadable = 0
+
+    def drain_one() -> Iterator[Dict[str, str]]:
+        nonlocal unreadable
+        offers, errors = pending.popleft().result()
+        if errors:
+            unreadable += len(errors)
+            print(f"⚠️  {len(errors)} message(s) illisible(s) dans un lot: {errors[0]}")
+        for off in offers:
+            if off["URL Offre"] not in seen:
+                seen.add(off["URL Offre"])
+                yield off
+
+    for batch in batches:
+        pending.append(executor.submit(parse_batch, batch))
+        if len(pending) >= max_pending:
+            yield from drain_one()
+    while pending:
+        yield from drain_one()
+    if unreadable:
+        print(f"⚠️  {unreadable} message(s) illisible(s) au total.")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Backfill des alertes Jobup depuis une archive mbox/.eml")
+    parser.add_argument("source", help="Fichier mbox ou dossier de fichiers .eml")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Nombre de processus d'analyse")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="Base SQLite de la file de travail")
+    sink = parser.add_mutually_exclusive_group()
+    sink.add_argument("--scrape", action="store_true", help=f"Scrape les offres et exporte {OUTPUT_XLSX}")
+    sink.add_argument("--offers-only", metavar="XLSX", help="Exporte les offres sans scraping")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        print(f"❌ Source introuvable: {args.source}")
+        return 2
+
+    if args.scrape:
+        from email_jobup_reader import scrape_and_export
+        from utils import find_chromedriver_binary
+
+        chromedriver_path = find_chromedriver_binary()
+        if not chromedriver_path:
+            print("❌ ChromeDriver introuvable. Lance d'abord: python update_chromedriver.py")
+            return 1
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            offers = list(iter_offers(iter_raw_messages(args.source), executor))
+        # Le scraping dure des heures : les processus d'analyse sont déjà libérés
+        scrape_and_export(offers, chromedriver_path)
+        return 0
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        offers = iter_offers(iter_raw_messages(args.source), executor)
+        if args.offers_only:
+            from excel_export import export_rows
+
+            export_rows(offers, args.offers_only, OFFER_COLUMNS)
+            print(f"✅ Export: {args.offers_only}")
+        else:
+            queue = WorkQueue(args.queue)
+            found = added = 0
+            for off in offers:
+                found += 1
+                added += queue.enqueue("offer", off["URL Offre"], off)
+            print(f"📨 {found} offre(s) trouvée(s), {added} nouvelle(s) en file.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark URL canonicalization over a large synthetic column.
+
+Compares the previous per-row ``.apply(normalize_linkedin_url)`` with
+``url_canon.canonicalize_series`` on LinkedIn, DuckDuckGo redirect and Jobup
+offer URLs, with a configurable share of repeated values.
+
+Usage:
+  python benchmarks/bench_canonicalize.py              # 1,000,000 URLs
+  python benchmarks/bench_canonicalize.py --rows 200000 --unique 0.2
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+import url_canon
+from utils import normalize_linkedin_url
+
+
+def make_urls(n_unique: int, seed: int = 0) -> list[str]:
+    rnd = random.Random(seed)
+    urls = []
+    for i in range(n_unique):
+        kind = i % 3
+        if kind == 0:
+            sub = rnd.choice(["www", "ch", "fr"])
+            urls.append(f"https://{sub}.linkedin.com/in/person-{i:x}/?trk=public_profile")
+        elif kind == 1:
+            target = f"https://www.linkedin.com/company/company-{i:x}/about/"
+            urls.append(f"https://duckduckgo.com/l/?uddg={quote(target, safe='')}&rut=abc")
+        else:
+            locale = rnd.choice(["fr/emplois", "de/stellenangebote", "en/jobs"])
+            offer = uuid.UUID(int=rnd.getrandbits(128))
+            urls.append(f"https://www.jobup.ch/{locale}/detail/{offer}/?utm_source=alert&utm_medium=email")
+    return urls
+
+
+def timed(label: str, func) -> float:
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<45} {elapsed:8.2f} s")
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="URL canonicalization benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--unique", type=float, default=0.05, help="Share of distinct URLs (0-1]")
+    args = parser.parse_args()
+
+    n_unique = max(1, int(args.rows * args.unique))
+    pool = make_urls(n_unique)
+    rnd = random.Random(1)
+    series = pd.Series(rnd.choices(pool, k=args.rows), dtype=object)
+    print(f"{args.rows:,} URLs, {n_unique:,} distinct\n")
+
+    base = timed(".apply(normalize_linkedin_url)", lambda: series.apply(normalize_linkedin_url))
+    url_canon._canonical_resolved.cache_clear()
+    url_canon.resolve_redirect.cache_clear()
+    new = timed("canonicalize_series(kind='any'), cold cache", lambda: url_canon.canonicalize_series(series))
+    timed("canonicalize_series(kind='any'), warm cache", lambda: url_canon.canonicalize_series(series))
+    print(f"\nSpeed-up (cold): x{base / new:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Peak RSS and wall time of the Excel export paths at 10k and 100k rows.
+
+Each measurement runs in a fresh interpreter and reports ``ru_maxrss``
+(Unix only), so numbers include the interpreter and pandas themselves:
+
+* ``to_excel``       - previous ``DataFrame.to_excel`` (openpyxl default mode)
+* ``export_df``      - ``excel_export.export_dataframe`` on the same DataFrame
+* ``export_rows``    - ``excel_export.export_rows`` fed by a generator, i.e.
+                       without ever holding the rows in memory
+
+Usage:
+  python benchmarks/bench_excel_export.py
+  python benchmarks/bench_excel_export.py --rows 10000 --rows 250000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLUMNS = [
+    "Titre Offre", "Entreprise (mail)", "Localisation", "URL Offre", "Contact Offre",
+    "Téléphone Offre", "Entreprise (scrapée)", "LinkedIn Company URL",
+    "LinkedIn Profile URL", "Email (FE)",
+]
+
+CHILD = r"""
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+mode, n, path, columns = sys.argv[1], int(sys.argv[2]), sys.argv[3], json.loads(sys.argv[4])
+
+def row(i):
+    return {{c: f"{{c}} valeur {{i}} " + "x" * 30 for c in columns}}
+
+start = time.perf_counter()
+if mode == "export_rows":
+    from excel_export import export_rows
+    export_rows((row(i) for i in range(n)), path, columns)
+else:
+    import pandas as pd
+    df = pd.DataFrame([row(i) for i in range(n)], columns=columns)
+    if mode == "to_excel":
+        df.to_excel(path, index=False)
+    else:
+        from excel_export import export_dataframe
+        export_dataframe(df, path)
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    rss //= 1024
+print(json.dumps({{"seconds": elapsed, "peak_mb": rss / 1024}}))
+"""
+
+
+def measure(mode: str, rows: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.xlsx")
+        proc = subprocess.run(
+            [sys.executable, "-c", CHILD.format(root=ROOT), mode, str(rows), path, json.dumps(COLUMNS)],
+            capture_output=True, text=True, check=True,
+        )
+    return json.loads(proc.stdout)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Excel export memory benchmark")
+    parser.add_argument("--rows", type=int, action="append")
+    args = parser.parse_args()
+
+    print(f"{'rows':>8}  {'mode':<12} {'peak RSS':>10} {'time':>8}")
+    for rows in args.rows or [10_000, 100_000]:
+        for mode in ("to_excel", "export_df", "export_rows"):
+            res = measure(mode, rows)
+            print(f"{rows:>8}  {mode:<12} {res['peak_mb']:>7.0f} MB {res['seconds']:>7.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Measure the import cost of every pipeline module with ``python -X importtime``.
+
+Each module is imported in a fresh interpreter; the cumulative time reported
+for the module itself is printed along with any heavy dependency (selenium,
+pandas, ...) that got pulled in at import time, which should be none.
+
+Usage:
+  python benchmarks/bench_startup.py
+  python benchmarks/bench_startup.py --repeat 5 utils run_pipeline
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "utils",
+    "rate_control",
+    "browser_governor",
+    "work_queue",
+    "url_canon",
+    "snapshot_store",
+    "update_chromedriver",
+    "email_jobup_reader",
+    "linkedin_company_retriever",
+    "linkedin_profile_retriever",
+    "fullenrich_scraper",
+    "run_pipeline",
+    "pipeline_daemon",
+    "mail_ingest",
+]
+
+HEAVY = ["selenium", "pandas", "numpy", "openpyxl", "imapclient", "pyzmail", "bs4", "requests", "psutil"]
+
+
+def import_time(module: str) -> tuple[float, list[str]]:
+    """Return (cumulative import time in ms, heavy packages imported)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative_us = 0
+    heavy = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line.split(":", 1)[1].split("|")]
+        if not parts[1].isdigit():
+            continue  # header line
+        name = parts[2]
+        top = name.split(".")[0]
+        if top in HEAVY:
+            heavy.add(top)
+        if name == module:
+            cumulative_us = int(parts[1])
+    return cumulative_us / 1000, sorted(heavy)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'module':<30} {'median ms':>10}  heavy imports")
+    for module in args.modules:
+        runs = [import_time(module) for _ in range(args.repeat)]
+        median = statistics.median(ms for ms, _ in runs)
+        heavy = runs[-1][1]
+        print(f"{module:<30} {median:>10.1f}  {', '.join(heavy) or '-'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
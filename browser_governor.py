@@ -0,0 +1,429 @@
+"""Track, cap and clean up the Chrome instances spawned by the pipeline.
+
+Every browser goes through :meth:`BrowserGovernor.acquire` /
+:meth:`BrowserGovernor.release`. The governor tags each Chrome it starts with
+the owning PID, keeps the summed RSS of all chromedriver/chrome process trees
+under a budget (recycling warm instances first, refusing new ones otherwise),
+kills instances left behind by crashed runs, and reports the peak memory
+seen by the step on exit.
+"""
+
+import atexit
+import json
+import os
+import subprocess
+import threading
+import time
+
+OWNER_FLAG = "--autoscrap-owner"
+DEFAULT_RSS_BUDGET_MB = 1500
+DEFAULT_MAX_INSTANCES = 2
+DEFAULT_MAX_USES = 50
+DEFAULT_ACQUIRE_TIMEOUT = 300
+DEFAULT_MAX_IDLE = 600
+
+
+class BrowserBudgetExceeded(RuntimeError):
+    """Raised when starting another browser would exceed the memory budget."""
+
+
+def _env_int(key: str, default: int) -> int:
+    try:
+        return int(os.getenv(key, ""))
+    except ValueError:
+        return default
+
+
+def _tree_procs(pid: int) -> list:
+    """Return the process *pid* followed by all its descendants."""
+    import psutil
+
+    try:
+        root = psutil.Process(pid)
+        return [root, *root.children(recursive=True)]
+    except psutil.Error:
+        return []
+
+
+def _tree_rss(pid: int) -> int:
+    """Return the summed RSS in bytes of *pid* and all its descendants."""
+    import psutil
+
+    total = 0
+    for proc in _tree_procs(pid):
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            continue
+    return total
+
+
+def _kill_procs(procs: list) -> None:
+    import psutil
+
+    for proc in procs:
+        try:
+            proc.kill()
+        except psutil.Error:
+            continue
+    psutil.wait_procs(procs, timeout=5)
+
+
+def _provisioned_drivers() -> tuple[str, str | None]:
+    """Return the ``chromedriver/`` folder and the manifest ``driver_path``.
+
+    Both are resolved real paths; they identify the ChromeDriver installed
+    for the pipeline by ``update_chromedriver.py``.
+    """
+    from utils import CHROMEDRIVER_MANIFEST
+
+    folder = os.path.realpath(os.path.dirname(CHROMEDRIVER_MANIFEST))
+    try:
+        with open(CHROMEDRIVER_MANIFEST, "r", encoding="utf-8") as f:
+            driver_path = json.load(f).get("driver_path")
+    except (OSError, ValueError):
+        driver_path = None
+    return folder, os.path.realpath(driver_path) if driver_path else None
+
+
+def _runs_provisioned_driver(info: dict, folder: str, driver_path: str | None) -> bool:
+    """Tell whether a process executes the provisioned ChromeDriver binary."""
+    for exe in (info.get("exe"), *(info.get("cmdline") or [])[:1]):
+        if not exe:
+            continue
+        path = os.path.realpath(exe)
+        if path == driver_path:
+            return True
+        try:
+            if os.path.commonpath([folder, path]) == folder:
+                return True
+        except ValueError:  # autre lecteur sous Windows
+            continue
+    return False
+
+
+def reap_orphans() -> int:
+    """Kill chrome/chromedriver processes left behind by dead pipeline runs.
+
+    Chrome instances carry ``--autoscrap-owner=<pid>`` and are killed when
+    that PID no longer exists. ChromeDriver processes of the current user
+    running the binary provisioned by ``update_chromedriver.py`` are
+    killed when their parent is gone; drivers started by other tools from
+    elsewhere are left alone. Returns the number of processes killed.
+    """
+    import psutil
+
+    me = os.getpid()
+    try:
+        user = psutil.Process(me).username()
+    except psutil.Error:
+        user = None
+    folder, driver_path = _provisioned_drivers()
+    victims = []
+    for proc in psutil.process_iter(["pid", "name", "exe", "cmdline", "ppid", "username"]):
+        info = proc.info
+        if info["pid"] == me or (user and info["username"] != user):
+            continue
+        name = (info["name"] or "").lower()
+        cmdline = info["cmdline"] or []
+        if "chromedriver" in name:
+            ppid = info["ppid"] or 0
+            # En PID 1 (conteneur), nos propres drivers ont ppid == 1
+            orphaned = (ppid <= 1 and me != 1) or not psutil.pid_exists(ppid)
+            if orphaned and _runs_provisioned_driver(info, folder, driver_path):
+                victims.append(proc)
+            continue
+        for arg in cmdline:
+            if arg.startswith(OWNER_FLAG + "="):
+                owner = arg.split("=", 1)[1]
+                if owner.isdigit() and int(owner) != me and not psutil.pid_exists(int(owner)):
+                    victims.append(proc)
+                break
+    if victims:
+        _kill_procs(victims)
+        print(f"🧹 {len(victims)} processus Chrome/ChromeDriver orphelins arrêtés.")
+    return len(victims)
+
+
+class BrowserGovernor:
+    """Hand out Chrome drivers while enforcing a total RSS budget.
+
+    ``rss_budget_mb`` and ``max_instances`` default to the
+    ``BROWSER_RSS_BUDGET_MB`` and ``BROWSER_MAX_INSTANCES`` environment
+    variables. With ``keep_warm`` enabled released drivers that are still
+    alive are kept for reuse until they have served ``max_uses`` pages, sat
+    idle for ``max_idle`` seconds (``BROWSER_MAX_IDLE``) or the budget is
+    needed for a new instance. A warm driver is only handed out to callers
+    passing the same Chrome arguments it was started with, and only after a
+    liveness probe.
+
+    Browsers are started and quit outside the internal lock, so a slow
+    teardown does not hold up the other threads.
+
+    When no slot is free, :meth:`acquire` waits up to ``acquire_timeout``
+    seconds (``BROWSER_ACQUIRE_TIMEOUT``) for another thread to release a
+    browser before raising :class:`BrowserBudgetExceeded`.
+    """
+
+    def __init__(
+        self,
+        rss_budget_mb: int | None = None,
+        max_instances: int | None = None,
+        keep_warm: bool = False,
+        max_uses: int = DEFAULT_MAX_USES,
+        acquire_timeout: float | None = None,
+        max_idle: float | None = None,
+    ) -> None:
+        if rss_budget_mb is None:
+            rss_budget_mb = _env_int("BROWSER_RSS_BUDGET_MB", DEFAULT_RSS_BUDGET_MB)
+        if max_instances is None:
+            max_instances = _env_int("BROWSER_MAX_INSTANCES", DEFAULT_MAX_INSTANCES)
+        self.rss_budget = rss_budget_mb * 1024 * 1024
+        self.max_instances = max_instances
+        self.keep_warm = keep_warm
+        self.max_uses = max_uses
+        if acquire_timeout is None:
+            acquire_timeout = _env_int("BROWSER_ACQUIRE_TIMEOUT", DEFAULT_ACQUIRE_TIMEOUT)
+        self.acquire_timeout = acquire_timeout
+        if max_idle is None:
+            max_idle = _env_int("BROWSER_MAX_IDLE", DEFAULT_MAX_IDLE)
+        self.max_idle = max_idle
+        self.peak_rss = 0
+        self._busy: dict[int, object] = {}
+        # (signature, driver, idle since), plus ancien en tête
+        self._idle: list[tuple[tuple, object, float]] = []
+        self._kinds: dict[int, tuple] = {}
+        self._uses: dict[int, int] = {}
+        self._pids: dict[int, int] = {}
+        self._starting = 0  # slots réservés pendant le démarrage de Chrome
+        self._stopping = 0  # slots encore occupés pendant l'arrêt de Chrome
+        # Daemon workers share one governor from several threads
+        self._lock = threading.Condition(threading.RLock())
+
+    @staticmethod
+    def _driver_pid(driver) -> int | None:
+        proc = getattr(getattr(driver, "service", None), "process", None)
+        return getattr(proc, "pid", None)
+
+    def total_rss(self) -> int:
+        """Return the current summed RSS of all tracked browsers, in bytes."""
+        return sum(_tree_rss(pid) for pid in self._pids.values())
+
+    def sample(self) -> int:
+        total = self.total_rss()
+        self.peak_rss = max(self.peak_rss, total)
+        return total
+
+    @staticmethod
+    def _signature(options) -> tuple:
+        return tuple(getattr(options, "arguments", ()))
+
+    def _alive(self, driver) -> bool:
+        """Cheap liveness probe: chromedriver running and the session answering."""
+        proc = getattr(getattr(driver, "service", None), "process", None)
+        if proc is not None and proc.poll() is not None:
+            return False
+        try:
+            driver.current_url
+        except Exception:
+            return False
+        return True
+
+    def _take_idle(self, signature: tuple):
+        for i in range(len(self._idle) - 1, -1, -1):
+            if self._idle[i][0] == signature:
+                return self._idle.pop(i)[1]
+        return None
+
+    @property
+    def instances(self) -> int:
+        return len(self._busy) + len(self._idle) + self._starting + self._stopping
+
+    def _retire(self, driver) -> tuple:
+        """Forget *driver* (lock held); pass the result to :meth:`_teardown`.
+
+        Its slot stays counted in :attr:`instances` until the teardown is done.
+        """
+        key = id(driver)
+        pid = self._pids.pop(key, None)
+        self._uses.pop(key, None)
+        self._kinds.pop(key, None)
+        self._stopping += 1
+        return driver, pid
+
+    def _teardown(self, retired: list[tuple]) -> None:
+        """Quit retired drivers and kill their process trees, without the lock."""
+        if not retired:
+            return
+        try:
+            for driver, pid in retired:
+                # Snapshot the tree first: once chromedriver exits its children are
+                # reparented and could no longer be found from its PID.
+                procs = _tree_procs(pid) if pid is not None else []
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+                _kill_procs([p for p in procs if p.is_running()])
+        finally:
+            with self._lock:
+                self._stopping -= len(retired)
+                self._lock.notify_all()
+
+    def _expire_idle(self) -> list[tuple]:
+        """Retire warm drivers idle for longer than ``max_idle`` (lock held)."""
+        limit = time.monotonic() - self.max_idle
+        expired = [d for _, d, since in self._idle if since < limit]
+        self._idle = [entry for entry in self._idle if entry[2] >= limit]
+        return [self._retire(d) for d in expired]
+
+    def _room_error(self, retired: list[tuple]) -> str | None:
+        """Evict warm drivers as needed into *retired*; return why no browser
+        can start, if so."""
+        while self._idle and (
+            self.instances - self._stopping >= self.max_instances or self.sample() >= self.rss_budget
+        ):
+            retired.append(self._retire(self._idle.pop(0)[1]))
+        if self.instances >= self.max_instances:
+            return f"{self.instances} navigateurs actifs (max {self.max_instances})."
+        if self.sample() >= self.rss_budget:
+            return f"Budget mémoire navigateurs atteint ({self.rss_budget // 2**20} Mo)."
+        return None
+
+    def acquire(self, options, chromedriver_path: str):
+        """Return a Chrome driver for *options*, reusing a warm one if allowed.
+
+        Blocks while the instance or memory budget is exhausted, up to
+        ``acquire_timeout`` seconds. A warm driver failing the liveness probe
+        is quit and another one is looked for.
+        """
+        signature = self._signature(options)
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            warm = None
+            start = False
+            with self._lock:
+                retired = self._expire_idle()
+                while not retired:
+                    warm = self._take_idle(signature)
+                    if warm is not None:
+                        self._busy[id(warm)] = warm
+                        break
+                    error = self._room_error(retired)
+                    if error is None:
+                        self._starting += 1
+                        start = True
+                        break
+                    if retired:
+                        break  # place libérée après l'arrêt, hors du verrou
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise BrowserBudgetExceeded(error)
+                    self._lock.wait(remaining)
+            self._teardown(retired)
+            if start:
+                break
+            if warm is None:
+                continue
+            # Sonde hors du verrou : un navigateur mort entre deux rafales
+            # ne coûte pas une tentative au travail
+            if self._alive(warm):
+                with self._lock:
+                    self._uses[id(warm)] = self._uses.get(id(warm), 0) + 1
+                return warm
+            with self._lock:
+                self._busy.pop(id(warm), None)
+                dead = [self._retire(warm)]
+            self._teardown(dead)
+
+        # Chrome démarre hors du verrou : les autres threads ne sont pas bloqués
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+
+        try:
+            options.add_argument(f"{OWNER_FLAG}={os.getpid()}")
+            driver = webdriver.Chrome(service=Service(chromedriver_path), options=options)
+        except BaseException:
+            with self._lock:
+                self._starting -= 1
+                self._lock.notify_all()
+            raise
+        with self._lock:
+            self._starting -= 1
+            pid = self._driver_pid(driver)
+            if pid is not None:
+                self._pids[id(driver)] = pid
+            self._kinds[id(driver)] = signature
+            self._busy[id(driver)] = driver
+            self._uses[id(driver)] = 1
+            return driver
+
+    def release(self, driver, healthy: bool = True) -> None:
+        """Return *driver* to the governor, quitting or keeping it warm.
+
+        Pass ``healthy=False`` when the caller hit an exception: the driver is
+        then always quit. A driver failing the liveness probe is quit too.
+        """
+        keep = healthy and self.keep_warm and self._alive(driver)
+        with self._lock:
+            self._busy.pop(id(driver), None)
+            self.sample()
+            retired = self._expire_idle()
+            if (
+                keep
+                and self._uses.get(id(driver), 0) < self.max_uses
+                and self.total_rss() < self.rss_budget
+            ):
+                self._idle.append((self._kinds.get(id(driver), ()), driver, time.monotonic()))
+            else:
+                retired.append(self._retire(driver))
+            self._lock.notify_all()
+        self._teardown(retired)
+
+    def shutdown(self) -> None:
+        """Quit every tracked browser, warm or busy."""
+        with self._lock:
+            drivers = [*(d for _, d, _ in self._idle), *self._busy.values()]
+            self._idle.clear()
+            self._busy.clear()
+            retired = [self._retire(d) for d in drivers]
+            self._lock.notify_all()
+        self._teardown(retired)
+
+    def report(self) -> None:
+        if self.peak_rss:
+            print(f"📈 Pic mémoire navigateurs: {self.peak_rss / 2**20:.0f} Mo")
+
+
+_GOVERNOR: BrowserGovernor | None = None
+_GOVERNOR_LOCK = threading.Lock()
+
+
+def get_governor() -> BrowserGovernor:
+    """Return the process-wide governor, reaping orphans on first use."""
+    global _GOVERNOR
+    with _GOVERNOR_LOCK:
+        if _GOVERNOR is None:
+            reap_orphans()
+            _GOVERNOR = BrowserGovernor()
+            atexit.register(_shutdown)
+        return _GOVERNOR
+
+
+def _shutdown() -> None:
+    if _GOVERNOR is None:
+        return
+    _GOVERNOR.shutdown()
+    _GOVERNOR.report()
+
+
+def watch_process_tree(popen, interval: float = 0.5) -> int:
+    """Wait for *popen* and return the peak RSS in bytes of its process tree."""
+    peak = 0
+    while True:
+        peak = max(peak, _tree_rss(popen.pid))
+        try:
+            popen.wait(timeout=interval)
+            return peak
+        except subprocess.TimeoutExpired:
+            continue
@@ -1,65 +1,81 @@
 # email_jobup_reader.py
 # -*- coding: utf-8 -*-
 
-from imapclient import IMAPClient
-import pyzmail
-import pandas as pd
-from bs4 import BeautifulSoup
-import os, sys, time, glob, random
-from typing import Optional, List, Dict
-
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-
-from utils import load_env_file
-
-load_env_file()
+# Les dépendances lourdes (selenium, pandas, imapclient, pyzmail, bs4) sont
+# importées dans les fonctions qui les utilisent : importer ce module est
+# quasi gratuit et sans effet de bord.
+import os, sys, time
+from typing import TYPE_CHECKING, Optional, List, Dict
+
+from excel_export import existing_parts, export_dataframe, read_export
+from utils import find_chromedriver_binary, load_env_file
+from browser_governor import get_governor
+from url_canon import canonical_offer_url
+from snapshot_store import get_store, save_snapshot
+from rate_control import (
+    STATUS_BLOCKED,
+    STATUS_OK,
+    BlockedError,
+    ThrottleTimeout,
+    controller_for,
+    looks_blocked,
+    process_with_requeue,
+    result_status,
+)
+
+if TYPE_CHECKING:
+    from selenium import webdriver
+
+    from mail_ingest import AlertBatch
 
 # ----------------------
 # Config
 # ----------------------
-EMAIL_ADDR = os.getenv("JOBUP_EMAIL", "test.antho.undersales@gmail.com")
-EMAIL_APP_PASSWORD = os.getenv("JOBUP_EMAIL_APP_PASSWORD")  # ex: "huek ipka vfbw btdl"
+DEFAULT_EMAIL_ADDR = "test.antho.undersales@gmail.com"
 IMAP_SERVER = "imap.gmail.com"
 IMAP_FOLDER = "INBOX"
 SENDER_EMAIL = "noreply@jobup.ch"
 SUBJECT_KEYWORDS = ["job alert", "job offers", "offres d'emploi", "jobs"]
 
 OUTPUT_XLSX = "offres_jobup.xlsx"
+OFFER_COLUMNS = ["Titre Offre", "Entreprise (mail)", "Localisation", "URL Offre"]
+STATUS_COLUMN = "Statut Offre"
+EMPTY_DETAILS: Dict[str, Optional[str]] = {"Contact Offre": None, "Téléphone Offre": None, "Entreprise (scrapée)": None}
+FETCH_BATCH = 50
+
+# Sélecteurs partagés par l'extraction en direct (Selenium) et la
+# ré-extraction hors ligne depuis les snapshots (extract_from_html).
+# Les sélecteurs commençant par "//" sont des XPath.
+COMPANY_SELECTORS = [
+    "[data-cy='company-name']",
+    "a[data-cy='company-name']",
+    "[data-cy='company-information'] h2",
+    "a[href*='/fr/entreprise/']",
+    "div[class*='company'] a[href*='/entreprise/']",
+]
+CONTACT_REVEAL_SELECTORS = [
+    "[data-cy='vacancy-contact-toggle']",
+    "button[data-cy='vacancy-contact-toggle']",
+    "//button[contains(., 'Contact') or contains(., 'Kontakt') or contains(., 'Contactez')]",
+]
+CONTACT_SELECTORS = [
+    "[data-cy='vacancy-contact-name']",
+    "[data-cy='vacancy-contact'] [data-cy='name']",
+    "section[id*='contact'] [class*='name']",
+    "//section//*[contains(@class,'name') and string-length(normalize-space())>0]",
+]
+PHONE_REVEAL_XPATHS = [
+    "//button[contains(., 'Voir le numéro')]",
+    "//button[contains(., 'Afficher le numéro')]",
+    "//button[contains(., 'Show phone')]",
+    "//a[contains(@href,'tel:') and string-length(normalize-space())=0]",  # parfois lien vide → cliquer avant
+]
+PHONE_SELECTOR = "a[href^='tel:']"
+COMPANY_META_SELECTOR = "meta[property='og:site_name'], meta[property='og:title']"
 
 # ----------------------
 # Helpers
 # ----------------------
-def find_chromedriver_binary() -> Optional[str]:
-    # 1) dossier local standard
-    pats = [
-        "chromedriver/**/chromedriver.exe",
-        "chromedriver/**/chromedriver",
-        "**/chromedriver.exe",
-        "**/chromedriver",
-    ]
-    for pat in pats:
-        for p in glob.glob(pat, recursive=True):
-            if os.path.isfile(p):
-                return os.path.abspath(p)
-    # 2) PATH
-    for p in os.getenv("PATH", "").split(os.pathsep):
-        cand = os.path.join(p, "chromedriver")
-        if os.name == "nt":
-            cand += ".exe"
-        if os.path.isfile(cand):
-            return os.path.abspath(cand)
-    # 3) fallback “classique” si tu utilises update_chromedriver.py
-    fallback = os.path.join("chromedriver", "chromedriver-win64", "chromedriver.exe")
-    return os.path.abspath(fallback) if os.path.isfile(fallback) else None
-
-def polite_delay(a=0.6, b=1.4):
-    time.sleep(random.uniform(a, b))
-
 def extract_offers_from_body(body_text: str) -> List[Dict[str, str]]:
     """
     Format attendu (3 lignes par offre) :
@@ -82,13 +98,17 @@ def extract_offers_from_body(body_text: str) -> List[Dict[str, str]]:
                     "Titre Offre": title_line,
                     "Entreprise (mail)": company,
                     "Localisation": location,
-                    "URL Offre": url_line,
+                    "URL Offre": canonical_offer_url(url_line),
                 })
             except Exception:
                 continue
     return offers
 
-def build_chrome(chromedriver_path: str) -> webdriver.Chrome:
+def build_chrome(chromedriver_path: str) -> "webdriver.Chrome":
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+
     opts = Options()
     opts.add_argument("--headless=new")
     opts.add_argument("--disable-blink-features=AutomationControlled")
@@ -100,21 +120,33 @@ def build_chrome(chromedriver_path: str) -> webdriver.Chrome:
     service = Service(chromedriver_path)
     return webdriver.Chrome(service=service, options=opts)
 
-def open_job_page_and_extract(url: str, chromedriver_path: str) -> Dict[str, Optional[str]]:
+def open_job_page_and_extract(url: str, chromedriver_path: str, meta: Optional[Dict[str, str]] = None) -> Dict[str, Optional[str]]:
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
     options = Options()
     options.add_argument("--headless=new")   # Mets en commentaire pour débug visuel
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_argument("--lang=fr-FR")
     options.add_argument("--window-size=1280,1800")
 
-    service = Service(chromedriver_path)
-    driver = webdriver.Chrome(service=service, options=options)
+    governor = get_governor()
+    driver = governor.acquire(options, chromedriver_path)
 
     contact_name = phone_number = company_name = None
+    healthy = True
 
     try:
-        driver.get(url)
-        WebDriverWait(driver, 12).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+        try:
+            driver.get(url)
+            WebDriverWait(driver, 12).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+        except TimeoutException:
+            raise ThrottleTimeout(f"Page Jobup sans réponse: {url}")
+        if looks_blocked(driver.page_source):
+            raise BlockedError(f"Page Jobup bloquée: {url}")
         accept_cookies_if_present(driver)
         time.sleep(0.3)
 
@@ -123,14 +155,7 @@ def open_job_page_and_extract(url: str, chromedriver_path: str) -> Dict[str, Opt
         time.sleep(0.4)
 
         # ---- 1) Titre/Entreprise (plusieurs sélecteurs possibles)
-        candidates_company = [
-            "[data-cy='company-name']",
-            "a[data-cy='company-name']",
-            "[data-cy='company-information'] h2",
-            "a[href*='/fr/entreprise/']",
-            "div[class*='company'] a[href*='/entreprise/']",
-        ]
-        for sel in candidates_company:
+        for sel in COMPANY_SELECTORS:
             try:
                 el = driver.find_element(By.CSS_SELECTOR, sel)
                 txt = el.text.strip()
@@ -142,12 +167,7 @@ def open_job_page_and_extract(url: str, chromedriver_path: str) -> Dict[str, Opt
 
         # ---- 2) Contact responsable (souvent caché derrière un bouton)
         # Essaye d'abord un “toggle” de contact
-        reveal_btn_selectors = [
-            "[data-cy='vacancy-contact-toggle']",
-            "button[data-cy='vacancy-contact-toggle']",
-            "//button[contains(., 'Contact') or contains(., 'Kontakt') or contains(., 'Contactez')]",
-        ]
-        for sel in reveal_btn_selectors:
+        for sel in CONTACT_REVEAL_SELECTORS:
             try:
                 if sel.startswith("//"):
                     btn = driver.find_element(By.XPATH, sel)
@@ -161,13 +181,7 @@ def open_job_page_and_extract(url: str, chromedriver_path: str) -> Dict[str, Opt
             except Exception:
                 pass
 
-        contact_selectors = [
-            "[data-cy='vacancy-contact-name']",
-            "[data-cy='vacancy-contact'] [data-cy='name']",
-            "section[id*='contact'] [class*='name']",
-            "//section//*[contains(@class,'name') and string-length(normalize-space())>0]",
-        ]
-        for sel in contact_selectors:
+        for sel in CONTACT_SELECTORS:
             try:
                 if sel.startswith("//"):
                     el = driver.find_element(By.XPATH, sel)
@@ -182,13 +196,7 @@ def open_job_page_and_extract(url: str, chromedriver_path: str) -> Dict[str, Opt
 
         # ---- 3) Téléphone (parfois “Afficher le numéro”)
         # Essaye de cliquer sur un bouton “voir/afficher le numéro”
-        show_phone_candidates = [
-            "//button[contains(., 'Voir le numéro')]",
-            "//button[contains(., 'Afficher le numéro')]",
-            "//button[contains(., 'Show phone')]",
-            "//a[contains(@href,'tel:') and string-length(normalize-space())=0]",  # parfois lien vide → cliquer avant
-        ]
-        for xp in show_phone_candidates:
+        for xp in PHONE_REVEAL_XPATHS:
             try:
                 btn = driver.find_element(By.XPATH, xp)
                 driver.execute_script("arguments[0].scrollIntoView({block:'center'});", btn)
@@ -201,7 +209,7 @@ def open_job_page_and_extract(url: str, chromedriver_path: str) -> Dict[str, Opt
 
         # Ensuite on lit un lien tel:
         try:
-            tel_el = driver.find_element(By.CSS_SELECTOR, "a[href^='tel:']")
+            tel_el = driver.find_element(By.CSS_SELECTOR, PHONE_SELECTOR)
             txt = tel_el.text.strip()
             if not txt:
                 # fallback: récupérer le href (tel:+41...)
@@ -215,7 +223,7 @@ def open_job_page_and_extract(url: str, chromedriver_path: str) -> Dict[str, Opt
         if not company_name:
             try:
                 # meta og:site_name ou og:title contiennent parfois le nom
-                metas = driver.find_elements(By.CSS_SELECTOR, "meta[property='og:site_name'], meta[property='og:title']")
+                metas = driver.find_elements(By.CSS_SELECTOR, COMPANY_META_SELECTOR)
                 for m in metas:
                     val = (m.get_attribute("content") or "").strip()
                     if val and len(val) > 2:
@@ -224,6 +232,12 @@ def open_job_page_and_extract(url: str, chromedriver_path: str) -> Dict[str, Opt
             except Exception:
                 pass
 
+        # ---- 5) Snapshot du DOM final pour ré-extraction hors ligne
+        save_snapshot(url, driver.page_source, "offer", meta)
+
+    except BaseException:
+        healthy = False  # navigateur possiblement planté : pas de réutilisation
+        raise
     finally:
         # Pour débug: sauvegarder une capture si rien trouvé
         if not (contact_name or phone_number or company_name):
@@ -232,7 +246,52 @@ def open_job_page_and_extract(url: str, chromedriver_path: str) -> Dict[str, Opt
                 print("🖼  Capture page dans debug_jobup.png (pour inspection).")
             except Exception:
                 pass
-        driver.quit()
+        governor.release(driver, healthy)
+
+    return {
+        "Contact Offre": contact_name,
+        "Téléphone Offre": phone_number,
+        "Entreprise (scrapée)": company_name,
+    }
+
+def extract_from_html(html: str) -> Dict[str, Optional[str]]:
+    """Offline counterpart of :func:`open_job_page_and_extract` on a stored DOM."""
+    import lxml.html
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "lxml")
+    tree = lxml.html.fromstring(html)
+
+    def first_text(selectors: List[str]) -> Optional[str]:
+        for sel in selectors:
+            if sel.startswith("//"):
+                nodes = tree.xpath(sel)
+                raw = nodes[0].text_content() if nodes else ""
+            else:
+                el = soup.select_one(sel)
+                raw = el.get_text(" ") if el else ""
+            txt = " ".join(raw.split())
+            if txt:
+                return txt
+        return None
+
+    company_name = first_text(COMPANY_SELECTORS)
+    contact_name = first_text(CONTACT_SELECTORS)
+
+    phone_number = None
+    tel_el = soup.select_one(PHONE_SELECTOR)
+    if tel_el is not None:
+        txt = " ".join(tel_el.get_text(" ").split())
+        if not txt:
+            txt = (tel_el.get("href") or "").replace("tel:", "").strip()
+        phone_number = txt or None
+
+    if not company_name:
+        for m in soup.select(COMPANY_META_SELECTOR):
+            val = (m.get("content") or "").strip()
+            if val and len(val) > 2:
+                company_name = val
+                break
 
     return {
         "Contact Offre": contact_name,
@@ -280,66 +339,185 @@ def accept_cookies_if_present(driver):
 # ----------------------
 # Main
 # ----------------------
-def fetch_jobup_emails() -> None:
-    if not EMAIL_APP_PASSWORD:
+def _decode_part(part) -> str:
+    """Decode a pyzmail part, falling back to UTF-8 on an unknown charset."""
+    payload = part.get_payload()
+    try:
+        return payload.decode(part.charset or "utf-8", errors="ignore")
+    except LookupError:
+        return payload.decode("utf-8", errors="ignore")
+
+def offers_from_message(raw: bytes) -> List[Dict[str, str]]:
+    """Parse one raw e-mail and return its Jobup offers (empty if not an alert)."""
+    import pyzmail
+    from bs4 import BeautifulSoup
+
+    msg = pyzmail.PyzMessage.factory(raw)
+
+    subject = (msg.get_subject() or "").strip()
+    from_email = (msg.get_addresses("from")[0][1] if msg.get_addresses("from") else "").strip()
+
+    if SENDER_EMAIL.lower() not in from_email.lower():
+        return []
+    if not any(k in subject.lower() for k in SUBJECT_KEYWORDS):
+        return []
+
+    # Corps du message
+    body: Optional[str] = None
+    if msg.text_part:
+        body = _decode_part(msg.text_part)
+    elif msg.html_part:
+        html = _decode_part(msg.html_part)
+        soup = BeautifulSoup(html, "html.parser")
+        body = soup.get_text("\n")
+
+    if not body:
+        return []
+    return extract_offers_from_body(body)
+
+def imap_credentials() -> tuple[str, str]:
+    """Return the IMAP login and app password from the environment / ``.env``."""
+    load_env_file()
+    email_addr = os.getenv("JOBUP_EMAIL", DEFAULT_EMAIL_ADDR)
+    email_app_password = os.getenv("JOBUP_EMAIL_APP_PASSWORD")  # ex: "huek ipka vfbw btdl"
+    if not email_app_password:
         print("❌ Mot de passe d'application Gmail manquant dans .env (JOBUP_EMAIL_APP_PASSWORD).")
         sys.exit(1)
+    return email_addr, email_app_password
 
-    chromedriver_path = find_chromedriver_binary()
-    if not chromedriver_path or not os.path.isfile(chromedriver_path):
-        print("❌ ChromeDriver introuvable. Lance d'abord: python update_chromedriver.py")
-        sys.exit(1)
+def peek_unseen_offers(server) -> tuple[List[Dict[str, str]], List[int]]:
+    """Read the unseen messages of the selected folder without flagging them.
 
-    all_rows: List[Dict[str, Optional[str]]] = []
+    Returns the offers found and the UIDs of the messages that were parsed;
+    pass those to :func:`mark_seen` once the offers are safely handed over.
+    A message that cannot be parsed is reported and left unseen.
+    """
+    offers: List[Dict[str, str]] = []
+    parsed: List[int] = []
+    messages = server.search(["UNSEEN"])
+    print(f"🔍 {len(messages)} e-mails non lus.")
+    # Un aller-retour par lot plutôt que par message ; PEEK ne pose pas \Seen
+    for start in range(0, len(messages), FETCH_BATCH):
+        batch = messages[start:start + FETCH_BATCH]
+        data = server.fetch(batch, ["BODY.PEEK[]"])
+        for uid in batch:
+            if uid not in data:
+                continue
+            try:
+                offers.extend(offers_from_message(data[uid][b"BODY[]"]))
+            except Exception as e:
+                print(f"⚠️  Message {uid} illisible, laissé non lu: {e}")
+                continue
+            parsed.append(uid)
+    return offers, parsed
 
-    with IMAPClient(IMAP_SERVER) as server:
-        server.login(EMAIL_ADDR, EMAIL_APP_PASSWORD)
-        server.select_folder(IMAP_FOLDER)
+def mark_seen(server, uids: List[int]) -> None:
+    """Flag *uids* of the selected folder as seen."""
+    from imapclient import SEEN
 
-        messages = server.search(["UNSEEN"])
-        print(f"🔍 {len(messages)} e-mails non lus.")
+    for start in range(0, len(uids), FETCH_BATCH):
+        server.add_flags(uids[start:start + FETCH_BATCH], [SEEN])
 
-        for uid in messages:
-            data = server.fetch([uid], ["BODY[]", "FLAGS"])
-            raw = data[uid][b"BODY[]"]
-            msg = pyzmail.PyzMessage.factory(raw)
+def open_alerts() -> "AlertBatch":
+    """Return the unseen Jobup alerts of every configured mailbox.
 
-            subject = (msg.get_subject() or "").strip()
-            from_email = (msg.get_addresses("from")[0][1] if msg.get_addresses("from") else "").strip()
+    See ``mail_ingest.AlertBatch``: iterate it for the offers and call
+    ``ack()`` once they are exported or enqueued.
+    """
+    from mail_ingest import open_alerts as open_mailboxes
 
-            if SENDER_EMAIL.lower() not in from_email.lower():
-                continue
-            if not any(k in subject.lower() for k in SUBJECT_KEYWORDS):
-                continue
+    return open_mailboxes()
 
-            # Corps du message
-            body: Optional[str] = None
-            if msg.text_part:
-                body = msg.text_part.get_payload().decode(msg.text_part.charset or "utf-8", errors="ignore")
-            elif msg.html_part:
-                html = msg.html_part.get_payload().decode(msg.html_part.charset or "utf-8", errors="ignore")
-                soup = BeautifulSoup(html, "html.parser")
-                body = soup.get_text("\n")
+def blocked_offers(path: str = OUTPUT_XLSX) -> List[Dict[str, Optional[str]]]:
+    """Return the offers of the export *path* whose page stayed blocked."""
+    if not existing_parts(path):
+        return []
+    df = read_export(path)
+    if STATUS_COLUMN not in df.columns:
+        return []
+    df = df.loc[df[STATUS_COLUMN] == STATUS_BLOCKED, [c for c in OFFER_COLUMNS if c in df.columns]]
+    return df.astype(object).where(df.notna(), None).to_dict("records")
 
-            if not body:
-                continue
+def scrape_and_export(all_offers: List[Dict[str, str]], chromedriver_path: str, output: str = OUTPUT_XLSX) -> None:
+    """Visit every offer page, then export offers + scraped details to *output*.
 
-            offers = extract_offers_from_body(body)
-            for off in offers:
-                polite_delay()
-                details = open_job_page_and_extract(off["URL Offre"], chromedriver_path)
-                row: Dict[str, Optional[str]] = {**off, **details}
-                all_rows.append(row)
+    Offers left blocked by the previous export to *output* are retried along
+    with the new ones.
+    """
+    import pandas as pd
+
+    retry = blocked_offers(output)
+    if retry:
+        print(f"🔁 {len(retry)} offre(s) bloquée(s) au dernier passage relancée(s).")
+    # dédup avant scraping : une même offre peut figurer dans plusieurs alertes
+    all_offers = list({off["URL Offre"]: off for off in [*retry, *all_offers]}.values())
+
+    # Les pages bloquées sont remises en file au lieu d'être exportées vides
+    details_list = process_with_requeue(
+        all_offers,
+        lambda off: open_job_page_and_extract(off["URL Offre"], chromedriver_path, off),
+        controller_for("www.jobup.ch"),
+    )
+    all_rows: List[Dict[str, Optional[str]]] = [
+        {**off, **(details or EMPTY_DETAILS), STATUS_COLUMN: result_status(details)}
+        for off, details in zip(all_offers, details_list)
+    ]
 
     if not all_rows:
         print("📭 Aucun contenu exporté.")
         return
 
     df = pd.DataFrame(all_rows)
-    # dédup stricte sur l’URL
+    # dédup stricte sur l’URL canonique
     df.drop_duplicates(subset=["URL Offre"], inplace=True)
-    df.to_excel(OUTPUT_XLSX, index=False)
-    print(f"✅ Export: {OUTPUT_XLSX} ({len(df)} lignes)")
+    export_dataframe(df, output)
+    print(f"✅ Export: {output} ({len(df)} lignes)")
+
+def fetch_jobup_emails() -> None:
+    chromedriver_path = find_chromedriver_binary()
+    if not chromedriver_path or not os.path.isfile(chromedriver_path):
+        print("❌ ChromeDriver introuvable. Lance d'abord: python update_chromedriver.py")
+        sys.exit(1)
+
+    with open_alerts() as alerts:
+        scrape_and_export(list(alerts), chromedriver_path)
+        # Marquées lues seulement une fois l'export écrit
+        alerts.ack()
+
+def reextract_from_snapshots(since: Optional[str] = None, output: str = OUTPUT_XLSX) -> None:
+    """Re-run extraction over stored offer pages, without any network access.
+
+    Blocked pages have no snapshot: the blocked rows of the previous export
+    to *output* are kept as they are, so the next run still retries them.
+    """
+    import pandas as pd
+
+    store = get_store()
+    snaps = store.latest("offer", since) if store is not None else []
+    if not snaps:
+        print("📭 Aucun snapshot d'offre à ré-extraire.")
+        return
+    rows = [
+        {**snap.meta, "URL Offre": snap.url, **extract_from_html(store.get(snap.sha256)), STATUS_COLUMN: STATUS_OK}
+        for snap in snaps
+    ]
+    extracted = {row["URL Offre"] for row in rows}
+    rows.extend(
+        {**off, **EMPTY_DETAILS, STATUS_COLUMN: STATUS_BLOCKED}
+        for off in blocked_offers(output) if off["URL Offre"] not in extracted
+    )
+    df = pd.DataFrame(rows)
+    export_dataframe(df, output)
+    print(f"✅ Ré-extraction: {output} ({len(df)} lignes depuis {store.root})")
 
 if __name__ == "__main__":
-    fetch_jobup_emails()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Lit les alertes Jobup et extrait les offres")
+    parser.add_argument("--reextract", action="store_true", help="Ré-extrait depuis les snapshots, sans réseau")
+    parser.add_argument("--since", help="Avec --reextract : snapshots depuis cette date (AAAA-MM-JJ)")
+    args = parser.parse_args()
+    if args.reextract:
+        reextract_from_snapshots(args.since)
+    else:
+        fetch_jobup_emails()
@@ -0,0 +1,224 @@
+"""Constant-memory Excel export shared by every step.
+
+``DataFrame.to_excel`` builds the whole workbook in memory before saving it.
+:func:`export_dataframe` instead streams rows through openpyxl's write-only
+mode chunk by chunk, rolls over to a new sheet or a new ``.partN.xlsx`` file
+past a size limit, and can append rows to an existing deliverable.
+:func:`read_export` reads such a deliverable back, all sheets and parts.
+"""
+
+import glob
+import os
+import re
+from collections.abc import Iterable, Iterator
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+EXCEL_MAX_ROWS = 1_048_576
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def part_path(path: str, index: int) -> str:
+    """Return the file name of shard *index* (1 is *path* itself)."""
+    if index == 1:
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.part{index}{ext}"
+
+
+def existing_parts(path: str) -> list[str]:
+    """Return *path* and its ``.partN`` shards that exist, in order."""
+    if not os.path.isfile(path):
+        return []
+    stem, ext = os.path.splitext(path)
+    numbered = []
+    for p in glob.glob(f"{glob.escape(stem)}.part*{ext}"):
+        m = re.search(r"\.part(\d+)" + re.escape(ext) + "$", p)
+        if m:
+            numbered.append((int(m.group(1)), p))
+    return [path] + [p for _, p in sorted(numbered)]
+
+
+def _chunks(df: "pd.DataFrame", chunk_size: int) -> Iterator[list[list[Any]]]:
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size].astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        yield chunk.values.tolist()
+
+
+class _ShardWriter:
+    """Write rows into write-only workbooks, rolling sheets and files."""
+
+    def __init__(self, path: str, header: list[str], rows_per_sheet: int,
+                 rows_per_file: int | None, first_part: int = 1) -> None:
+        self.path = path
+        self.header = header
+        self.rows_per_sheet = rows_per_sheet
+        self.rows_per_file = rows_per_file
+        self.part = first_part - 1
+        self.files: list[str] = []
+        self._wb = None
+        self._ws = None
+        self._sheet_rows = 0
+        self._file_rows = 0
+
+    def _open_file(self) -> None:
+        from openpyxl import Workbook
+
+        self.close()
+        self.part += 1
+        self._wb = Workbook(write_only=True)
+        self._file_rows = 0
+        self._open_sheet()
+
+    def _open_sheet(self) -> None:
+        index = len(self._wb.worksheets) + 1
+        self._ws = self._wb.create_sheet(f"Sheet{index}")
+        self._ws.append(self.header)
+        self._sheet_rows = 0
+
+    def append(self, row: list[Any]) -> None:
+        if self._wb is None or (self.rows_per_file and self._file_rows >= self.rows_per_file):
+            self._open_file()
+        elif self._sheet_rows >= self.rows_per_sheet:
+            self._open_sheet()
+        self._ws.append(row)
+        self._sheet_rows += 1
+        self._file_rows += 1
+
+    def ensure_open(self) -> None:
+        if self._wb is None:
+            self._open_file()
+
+    def close(self) -> None:
+        if self._wb is None:
+            return
+        target = part_path(self.path, self.part)
+        tmp = target + ".tmp"
+        self._wb.save(tmp)
+        os.replace(tmp, target)
+        self.files.append(target)
+        self._wb = self._ws = None
+
+
+def _iter_existing_rows(path: str) -> tuple[list[str], Iterator[list[Any]]]:
+    """Return the header of *path* and a lazy iterator over its data rows."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True)
+    header = [c for c in next(wb.worksheets[0].iter_rows(max_row=1, values_only=True))]
+
+    def rows() -> Iterator[list[Any]]:
+        try:
+            for ws in wb.worksheets:
+                for row in ws.iter_rows(min_row=2, values_only=True):
+                    yield list(row)
+        finally:
+            wb.close()
+
+    return header, rows()
+
+
+def _write(
+    path: str,
+    header: list[str],
+    make_rows,
+    append: bool,
+    rows_per_sheet: int,
+    rows_per_file: int | None,
+) -> list[str]:
+    """Stream ``make_rows(header)`` to *path*, after existing rows if *append*.
+
+    *make_rows* receives the final header (the existing one when appending)
+    and returns an iterator of row lists in that column order.
+    """
+    parts = existing_parts(path) if append else []
+    if not parts:
+        for stale in existing_parts(path)[1:]:
+            os.remove(stale)
+        writer = _ShardWriter(path, header, rows_per_sheet, rows_per_file)
+        for row in make_rows(header):
+            writer.append(row)
+        writer.ensure_open()  # en-tête seul pour un export vide
+        writer.close()
+        return writer.files
+
+    last = parts[-1]
+    existing_header, existing_rows = _iter_existing_rows(last)
+    missing = [c for c in header if c not in existing_header]
+    if missing:
+        existing_rows.close()
+        raise ValueError(f"Colonnes absentes de {last}: {missing}")
+    writer = _ShardWriter(path, existing_header, rows_per_sheet, rows_per_file,
+                          first_part=len(parts))
+    # Seul le dernier fichier est recopié, en flux, avant les nouvelles lignes
+    for row in existing_rows:
+        writer.append(row)
+    for row in make_rows(existing_header):
+        writer.append(row)
+    writer.close()
+    return writer.files
+
+
+def export_dataframe(
+    df: "pd.DataFrame",
+    path: str,
+    append: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    rows_per_sheet: int = EXCEL_MAX_ROWS - 1,
+    rows_per_file: int | None = None,
+) -> list[str]:
+    """Write *df* to *path* in streaming mode; return the files written.
+
+    Rows are converted and written ``chunk_size`` at a time, so the workbook
+    is never materialized in memory. A new sheet is started every
+    ``rows_per_sheet`` rows and a new ``<name>.partN.xlsx`` file every
+    ``rows_per_file`` rows.
+
+    With ``append=True`` the rows are added after those already in the
+    deliverable. Earlier shards are left untouched; only the last one is
+    re-streamed (an xlsx file is a zip archive and cannot be extended in
+    place), or a new shard is started when the last one is full. The
+    existing header must contain every column of *df*.
+    """
+    def make_rows(header: list[str]) -> Iterator[list[Any]]:
+        frame = df.set_axis([str(c) for c in df.columns], axis=1).reindex(columns=header)
+        for chunk in _chunks(frame, chunk_size):
+            yield from chunk
+
+    header = [str(c) for c in df.columns]
+    return _write(path, header, make_rows, append, rows_per_sheet, rows_per_file)
+
+
+def export_rows(
+    rows: Iterable[dict[str, Any]],
+    path: str,
+    columns: list[str],
+    append: bool = False,
+    rows_per_sheet: int = EXCEL_MAX_ROWS - 1,
+    rows_per_file: int | None = None,
+) -> list[str]:
+    """Stream an iterable of dict rows to *path* (see :func:`export_dataframe`).
+
+    Rows are consumed one at a time, so a generator of any length can be
+    exported without being collected first.
+    """
+    def make_rows(header: list[str]) -> Iterator[list[Any]]:
+        for row in rows:
+            yield [row.get(c) for c in header]
+
+    return _write(path, list(columns), make_rows, append, rows_per_sheet, rows_per_file)
+
+
+def read_export(path: str) -> "pd.DataFrame":
+    """Read every sheet of *path* and of its ``.partN`` shards."""
+    import pandas as pd
+
+    frames = []
+    for p in existing_parts(path) or [path]:
+        frames.extend(pd.read_excel(p, sheet_name=None).values())
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
@@ -1,13 +1,12 @@
-import pandas as pd
-import requests
 import time
-import os
 import sys
-from math import ceil
+from typing import TYPE_CHECKING
 
+from excel_export import export_dataframe, read_export
 from utils import load_env_file, getenv_or_file
 
-load_env_file()  # charge FULLENRICH_API_KEY si présent
+if TYPE_CHECKING:
+    import pandas as pd
 
 INPUT_XLSX = "offres_jobup_profile_linkedin.xlsx"
 OUTPUT_XLSX = "offres_jobup_enriched.xlsx"
@@ -15,14 +14,31 @@ BATCH_SIZE = 50
 POLL_MAX_TRIES = 30
 POLL_SLEEP = 5
 
-API_KEY = os.getenv("FULLENRICH_API_KEY") or getenv_or_file("FULLENRICH_API_KEY", "fullenrich_api_key.txt")
-if not API_KEY:
-    print("❌ FULLENRICH_API_KEY manquant (dans .env ou fullenrich_api_key.txt).")
-    sys.exit(1)
+_api_key: str | None = None
+_session = None
+
+def get_api_key() -> str:
+    """Return the FullEnrich API key, loading ``.env`` on first use."""
+    global _api_key
+    if _api_key is None:
+        load_env_file()  # charge FULLENRICH_API_KEY si présent
+        _api_key = getenv_or_file("FULLENRICH_API_KEY", "fullenrich_api_key.txt")
+        if not _api_key:
+            raise RuntimeError("FULLENRICH_API_KEY manquant (dans .env ou fullenrich_api_key.txt).")
+    return _api_key
+
+def get_session():
+    """Return the shared ``requests.Session`` (keep-alive across calls)."""
+    global _session
+    if _session is None:
+        import requests
+
+        _session = requests.Session()
+    return _session
 
 def send_bulk_enrichment(profiles):
     url = "https://app.fullenrich.com/api/v1/contact/enrich/bulk"
-    headers = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
+    headers = {"Authorization": f"Bearer {get_api_key()}", "Content-Type": "application/json"}
     payload = {
         "name": "Jobup Contact Enrichment",
         "datas": [
@@ -33,7 +49,7 @@ def send_bulk_enrichment(profiles):
             } for i, profile in enumerate(profiles)
         ]
     }
-    resp = requests.post(url, headers=headers, json=payload, timeout=60)
+    resp = get_session().post(url, headers=headers, json=payload, timeout=60)
     if resp.status_code == 429:
         raise RuntimeError("Rate limited by FullEnrich (429). Try later.")
     resp.raise_for_status()
@@ -41,10 +57,10 @@ def send_bulk_enrichment(profiles):
 
 def retrieve_bulk_results(enrichment_id):
     url = f"https://app.fullenrich.com/api/v1/contact/enrich/bulk/{enrichment_id}"
-    headers = {"Authorization": f"Bearer {API_KEY}"}
+    headers = {"Authorization": f"Bearer {get_api_key()}"}
     for _ in range(POLL_MAX_TRIES):
         time.sleep(POLL_SLEEP)
-        r = requests.get(url, headers=headers, timeout=60)
+        r = get_session().get(url, headers=headers, timeout=60)
         if r.status_code == 429:
             time.sleep(POLL_SLEEP * 2)
             continue
@@ -55,7 +71,7 @@ def retrieve_bulk_results(enrichment_id):
             return results
     return []
 
-def update_dataframe_with_results(df: pd.DataFrame, results: list) -> pd.DataFrame:
+def update_dataframe_with_results(df: "pd.DataFrame", results: list) -> "pd.DataFrame":
     cols = ["Prénom (FE)", "Nom (FE)", "Titre (FE)", "Poste (FE)", "Société (FE)", "Email (FE)", "Téléphone (FE)"]
     for c in cols:
         if c not in df.columns:
@@ -81,8 +97,15 @@ def update_dataframe_with_results(df: pd.DataFrame, results: list) -> pd.DataFra
     return df
 
 def main():
+    import pandas as pd
+
+    try:
+        get_api_key()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
     print("📥 Lecture:", INPUT_XLSX)
-    df = pd.read_excel(INPUT_XLSX)
+    df = read_export(INPUT_XLSX)
     profiles = df.get("LinkedIn Profile URL", pd.Series([])).dropna().astype(str)
     profiles = [p for p in profiles if p.startswith("https://www.linkedin.com/in/")]
     if not profiles:
@@ -109,7 +132,7 @@ def main():
 
     df = update_dataframe_with_results(df, all_results)
     df.fillna("", inplace=True)
-    df.to_excel(OUTPUT_XLSX, index=False)
+    export_dataframe(df, OUTPUT_XLSX)
     print(f"✅ Export: {OUTPUT_XLSX}")
 
 if __name__ == "__main__":
@@ -1,61 +1,40 @@
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import pandas as pd
 import sys
 
-from utils import (
-    find_chromedriver_binary,
-    find_first_linkedin_url,
-    polite_delay,
-)
+from excel_export import export_dataframe, read_export
+from utils import find_chromedriver_binary, search_duckduckgo
+from url_canon import canonicalize_series
+from rate_control import BLOCKED, controller_for, process_with_requeue, result_status
 
 INPUT_XLSX = "offres_jobup.xlsx"
 OUTPUT_XLSX = "offres_jobup_company_linkedin.xlsx"
 
-CHROMEDRIVER_PATH = find_chromedriver_binary()
-if not CHROMEDRIVER_PATH:
-    print("❌ ChromeDriver introuvable. Exécute d'abord update_chromedriver.py")
-    sys.exit(1)
-
 def search_company_on_duckduckgo(company_name: str) -> str | None:
     query = f"site:linkedin.com/company {company_name}"
-    search_url = f"https://duckduckgo.com/?q={query.replace(' ', '+')}"
-    options = webdriver.ChromeOptions()
-    options.add_argument("--headless=new")
-    options.add_argument("--lang=en-US")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    service = Service(CHROMEDRIVER_PATH)
-    driver = webdriver.Chrome(service=service, options=options)
-    try:
-        driver.get(search_url)
-        selector = "[data-testid='result-title-a'], a[href*='duckduckgo.com/l/?uddg=']"
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-        )
-        links = driver.find_elements(By.CSS_SELECTOR, selector)
-        hrefs = [(a.get_attribute("href") or "") for a in links]
-        return find_first_linkedin_url(hrefs, "linkedin.com/company")
-    finally:
-        driver.quit()
+    return search_duckduckgo(query, "linkedin.com/company")
 
 def main():
-    df = pd.read_excel(INPUT_XLSX)
+    import pandas as pd
+
+    if not find_chromedriver_binary():
+        print("❌ ChromeDriver introuvable. Exécute d'abord update_chromedriver.py")
+        sys.exit(1)
+    df = read_export(INPUT_XLSX)
     if "Entreprise (scrapée)" not in df.columns:
         raise RuntimeError("Colonne 'Entreprise (scrapée)' absente de l'entrée.")
-    results = []
-    for name in df["Entreprise (scrapée)"].fillna("").astype(str).tolist():
-        if not name.strip():
-            results.append(None)
-            continue
-        polite_delay(0.6, 1.6)
-        url = search_company_on_duckduckgo(name)
-        results.append(url)
-    df["LinkedIn Company URL"] = results
-    df.to_excel(OUTPUT_XLSX, index=False)
+    names = df["Entreprise (scrapée)"].fillna("").astype(str).tolist()
+    todo = [idx for idx, name in enumerate(names) if name.strip()]
+    found = process_with_requeue(
+        [names[idx] for idx in todo], search_company_on_duckduckgo, controller_for("duckduckgo.com")
+    )
+    results = [None] * len(names)
+    statuses = [None] * len(names)
+    for idx, url in zip(todo, found):
+        results[idx] = None if url is BLOCKED else url
+        statuses[idx] = result_status(url)
+    df["LinkedIn Company URL"] = canonicalize_series(pd.Series(results, index=df.index, dtype=object), "linkedin")
+    df["Statut LinkedIn Company"] = statuses
+    export_dataframe(df, OUTPUT_XLSX)
     print(f"✅ Export: {OUTPUT_XLSX}")
 
 if __name__ == "__main__":
@@ -0,0 +1,234 @@
+"""Concurrent ingestion of Jobup alerts from several mailboxes and folders.
+
+Accounts and their folders are read from a JSON file (``mailboxes.json`` or
+``MAILBOXES_CONFIG``)::
+
+    {"accounts": [
+        {"name": "romandie", "username": "alerts.ge@gmail.com",
+         "password_env": "JOBUP_GE_APP_PASSWORD",
+         "folders": ["INBOX", "Jobup/Genève"]},
+        {"name": "zurich", "host": "imap.example.ch", "username": "jobs@example.ch",
+         "password_env": "JOBUP_ZH_APP_PASSWORD", "folders": ["Alerts"], "connections": 3}
+    ]}
+
+Without a config file the single ``JOBUP_EMAIL`` account is used with
+``IMAP_FOLDER``, as before. Every account gets an :class:`ImapPool` of
+logged-in connections reused across folders; all folders are fetched at once
+and their offers are merged into one stream, deduplicated on the canonical
+offer URL.
+
+Alerts are read without being flagged: :meth:`AlertBatch.ack` marks them
+seen once the caller has enqueued or exported their offers, so a crash in
+between leaves them unseen for the next run.
+"""
+
+import json
+import os
+import threading
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from email_jobup_reader import IMAP_FOLDER, IMAP_SERVER, imap_credentials, mark_seen, peek_unseen_offers
+from utils import getenv_or_file, load_env_file
+
+DEFAULT_CONFIG = "mailboxes.json"
+DEFAULT_CONNECTIONS = 2
+
+
+@dataclass
+class Account:
+    name: str
+    username: str
+    password: str = field(repr=False)
+    folders: List[str] = field(default_factory=lambda: [IMAP_FOLDER])
+    host: str = IMAP_SERVER
+    port: int | None = None
+    ssl: bool = True
+    connections: int = DEFAULT_CONNECTIONS
+
+
+def load_accounts(path: str | None = None) -> List[Account]:
+    """Return the configured accounts, or the ``.env`` account by default."""
+    load_env_file()
+    path = path or os.getenv("MAILBOXES_CONFIG", DEFAULT_CONFIG)
+    if not os.path.isfile(path):
+        username, password = imap_credentials()
+        return [Account("default", username, password)]
+
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    accounts = []
+    for entry in config.get("accounts", []):
+        name = entry.get("name") or entry["username"]
+        password_env = entry.get("password_env", "JOBUP_EMAIL_APP_PASSWORD")
+        password = getenv_or_file(password_env, entry.get("password_file", ""))
+        if not password:
+            raise RuntimeError(f"Mot de passe manquant pour le compte {name!r} ({password_env}).")
+        accounts.append(Account(
+            name=name,
+            username=entry["username"],
+            password=password,
+            folders=list(entry.get("folders") or [IMAP_FOLDER]),
+            host=entry.get("host", IMAP_SERVER),
+            port=entry.get("port"),
+            ssl=entry.get("ssl", True),
+            connections=int(entry.get("connections", DEFAULT_CONNECTIONS)),
+        ))
+    if not accounts:
+        raise RuntimeError(f"Aucun compte dans {path}.")
+    return accounts
+
+
+class ImapPool:
+    """Up to ``account.connections`` logged-in IMAP connections, reused.
+
+    A folder is selected on a connection only for the duration of one
+    :meth:`connection` block, so any connection can serve any folder.
+    Connections that fail are dropped and replaced on the next request.
+    """
+
+    def __init__(self, account: Account) -> None:
+        self.account = account
+        self.opened = 0
+        self._idle: list = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, account.connections))
+
+    def _open(self):
+        from imapclient import IMAPClient
+
+        acc = self.account
+        server = IMAPClient(acc.host, port=acc.port, ssl=acc.ssl)
+        try:
+            server.login(acc.username, acc.password)
+        except Exception:
+            self._discard(server)
+            raise
+        self.opened += 1
+        return server
+
+    @staticmethod
+    def _discard(server) -> None:
+        try:
+            server.logout()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Lease a logged-in connection, opening one if none is idle."""
+        with self._slots:
+            with self._lock:
+                server = self._idle.pop() if self._idle else None
+            if server is None:
+                server = self._open()
+            try:
+                yield server
+            except Exception:
+                self._discard(server)
+                raise
+            with self._lock:
+                self._idle.append(server)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server in idle:
+            self._discard(server)
+
+
+def fetch_folder(pool: ImapPool, folder: str) -> tuple[List[Dict[str, str]], List[int]]:
+    """Return the offers of the unseen alerts in *folder* and their UIDs.
+
+    Nothing is flagged; pass the UIDs to :func:`mark_folder_seen` afterwards.
+    """
+    with pool.connection() as server:
+        server.select_folder(folder)
+        return peek_unseen_offers(server)
+
+
+def mark_folder_seen(pool: ImapPool, folder: str, uids: List[int]) -> None:
+    """Flag *uids* of *folder* as seen (UIDs stay valid across sessions)."""
+    if not uids:
+        return
+    with pool.connection() as server:
+        server.select_folder(folder)
+        mark_seen(server, uids)
+
+
+class AlertBatch:
+    """The unseen alerts of several accounts, flagged seen only on :meth:`ack`.
+
+    Iterating fetches every account/folder pair concurrently and yields
+    unique offers folder by folder as soon as each fetch completes, so a
+    large backlog in one folder does not delay the others. A failing account
+    or folder is reported and skipped. Use as a context manager::
+
+        with AlertBatch(load_accounts()) as alerts:
+            offers = list(alerts)
+            enqueue(offers)
+            alerts.ack()
+    """
+
+    def __init__(self, accounts: Iterable[Account], max_workers: int | None = None) -> None:
+        accounts = list(accounts)
+        self.pools = [ImapPool(acc) for acc in accounts]
+        self.max_workers = max_workers or sum(max(1, acc.connections) for acc in accounts) or 1
+        self._fetched: list[tuple[ImapPool, str, List[int]]] = []
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        tasks = [(pool, folder) for pool in self.pools for folder in pool.account.folders]
+        seen: set[str] = set()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="imap") as executor:
+            futures = {executor.submit(fetch_folder, pool, folder): (pool, folder) for pool, folder in tasks}
+            for future in as_completed(futures):
+                pool, folder = futures[future]
+                label = f"{pool.account.name}/{folder}"
+                try:
+                    offers, uids = future.result()
+                except Exception as e:
+                    print(f"❌ {label}: {e}")
+                    continue
+                self._fetched.append((pool, folder, uids))
+                new = []
+                for off in offers:
+                    if off["URL Offre"] not in seen:
+                        seen.add(off["URL Offre"])
+                        new.append(off)
+                print(f"📂 {label}: {len(offers)} offre(s), {len(new)} nouvelle(s).")
+                yield from new
+
+    def ack(self) -> int:
+        """Flag every alert read so far as seen; returns how many were flagged.
+
+        A folder that cannot be flagged is reported; its alerts will simply
+        be read again next time (offers are deduplicated downstream).
+        """
+        flagged = 0
+        fetched, self._fetched = self._fetched, []
+        for pool, folder, uids in fetched:
+            try:
+                mark_folder_seen(pool, folder, uids)
+            except Exception as e:
+                print(f"⚠️  {pool.account.name}/{folder}: alertes non marquées lues ({e})")
+                continue
+            flagged += len(uids)
+        return flagged
+
+    def close(self) -> None:
+        for pool in self.pools:
+            pool.close()
+
+    def __enter__(self) -> "AlertBatch":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_alerts(accounts: Iterable[Account] | None = None) -> AlertBatch:
+    """Return an :class:`AlertBatch` over all configured mailboxes."""
+    return AlertBatch(load_accounts() if accounts is None else accounts)
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Long-running service mode: process new Jobup alerts within seconds.
+
+An :class:`ImapWatcher` thread holds an IMAP IDLE connection on each alert
+folder and enqueues the offers of every new message in the work queue
+(see work_queue.py). Worker threads of the same process run the
+``run_pipeline`` stage handlers right away, with browsers kept warm by the
+governor and a shared FullEnrich HTTP session, so a burst of alerts pays no
+cold start. ``GET /health`` reports the IMAP connection, the workers and the
+queue. SIGTERM/SIGINT end the IDLE session, let every worker finish its
+current job, then close the browsers.
+
+Usage examples:
+  python pipeline_daemon.py
+  python pipeline_daemon.py --workers 3 --health-port 8765
+  python run_pipeline.py --daemon
+"""
+
+import argparse
+import json
+import signal
+import sys
+import threading
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+from work_queue import DEFAULT_QUEUE_PATH, Handler, WorkQueue, default_worker_id, enqueue_all, run_worker
+
+# Servers and NATs drop silent connections well before the 29 minutes of
+# RFC 2177: IDLE is re-issued every few minutes.
+IDLE_RENEW = 9 * 60
+IDLE_CHECK = 1.0
+MAX_BACKOFF = 60
+DEFAULT_WORKERS = 2
+DEFAULT_HEALTH_PORT = 8765
+
+
+class ImapWatcher:
+    """Watch one IMAP folder and pass the offers of new alerts to *on_offers*.
+
+    Unseen messages are drained on connect and after every ``EXISTS`` push;
+    servers without IDLE are polled every ``poll_interval`` seconds. Network
+    and protocol errors trigger a reconnect with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        on_offers: Callable[[List[Dict[str, str]]], Any],
+        host: str,
+        username: str,
+        password: str,
+        folder: str = "INBOX",
+        port: int | None = None,
+        ssl: bool = True,
+        idle_check: float = IDLE_CHECK,
+        idle_renew: float = IDLE_RENEW,
+        poll_interval: float = 30.0,
+    ) -> None:
+        self.on_offers = on_offers
+        self.host = host
+        self.username = username
+        self.password = password
+        self.folder = folder
+        self.port = port
+        self.ssl = ssl
+        self.idle_check = idle_check
+        self.idle_renew = idle_renew
+        self.poll_interval = poll_interval
+        self.connected = False
+        self.last_activity: float | None = None
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.run, name=f"imap-{self.folder}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def status(self) -> dict:
+        return {
+            "host": self.host,
+            "folder": self.folder,
+            "connected": self.connected,
+            "last_activity": self.last_activity,
+            "errors": self.errors,
+        }
+
+    def run(self) -> None:
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                self._session()
+                backoff = 1
+            except Exception as e:  # réseau, authentification, protocole
+                self.connected = False
+                self.errors += 1
+                print(f"⚠️  IMAP {self.folder}: {e} — reconnexion dans {backoff}s")
+                self._stop.wait(backoff)
+                backoff = min(MAX_BACKOFF, backoff * 2)
+        self.connected = False
+
+    def _session(self) -> None:
+        from imapclient import IMAPClient
+
+        with IMAPClient(self.host, port=self.port, ssl=self.ssl) as server:
+            server.login(self.username, self.password)
+            server.select_folder(self.folder)
+            self.connected = True
+            print(f"📬 IMAP connecté: {self.username} / {self.folder}")
+            can_idle = server.has_capability("IDLE")
+            while not self._stop.is_set():
+                self._drain(server)
+                if can_idle:
+                    self._idle(server)
+                elif not self._stop.wait(self.poll_interval):
+                    server.noop()
+            self.connected = False
+
+    def _drain(self, server) -> None:
+        from email_jobup_reader import mark_seen, peek_unseen_offers
+
+        offers, parsed = peek_unseen_offers(server)
+        self.last_activity = time.time()
+        if offers:
+            self.on_offers(offers)
+        # Marqués lus seulement une fois les offres en file
+        mark_seen(server, parsed)
+
+    def _idle(self, server) -> None:
+        """Idle until new mail, stop or renewal time, whichever comes first."""
+        server.idle()
+        deadline = time.monotonic() + self.idle_renew
+        try:
+            while not self._stop.is_set() and time.monotonic() < deadline:
+                responses = server.idle_check(timeout=self.idle_check)
+                self.last_activity = time.time()
+                if any(len(r) > 1 and r[1] in (b"EXISTS", b"RECENT") for r in responses):
+                    return
+        finally:
+            server.idle_done()
+
+
+class PipelineDaemon:
+    """Run IMAP watchers, warm worker threads and the health endpoint."""
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        handlers: dict[str, Handler],
+        workers: int = DEFAULT_WORKERS,
+        health_addr: tuple[str, int] | None = ("127.0.0.1", DEFAULT_HEALTH_PORT),
+        poll_interval: float = 1.0,
+    ) -> None:
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers
+        self.health_addr = health_addr
+        self.poll_interval = poll_interval
+        self.watchers: list[ImapWatcher] = []
+        self.offers_received = 0
+        self.started_at: float | None = None
+        self.health_server: ThreadingHTTPServer | None = None
+        self._threads: list[threading.Thread] = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()  # push() est appelé par chaque watcher
+
+    def watch(self, **imap: Any) -> ImapWatcher:
+        """Add an :class:`ImapWatcher` feeding this daemon (see its arguments)."""
+        watcher = ImapWatcher(self.push, **imap)
+        self.watchers.append(watcher)
+        return watcher
+
+    def push(self, offers: List[Dict[str, str]]) -> int:
+        """Enqueue *offers* for the workers; returns how many were new."""
+        added = enqueue_all(self.queue, "offer", ((off["URL Offre"], off) for off in offers))
+        with self._lock:
+            self.offers_received += len(offers)
+        print(f"📨 {added} nouvelle(s) offre(s) en file ({len(offers)} reçues).")
+        return added
+
+    def start(self) -> None:
+        self.started_at = time.time()
+        base_id = default_worker_id()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=run_worker,
+                args=(self.queue, self.handlers, f"{base_id}-{i}"),
+                kwargs={"poll_interval": self.poll_interval, "shutdown": self._stop},
+                name=f"worker-{i}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+        for watcher in self.watchers:
+            watcher.start()
+        if self.health_addr is not None:
+            self.health_server = ThreadingHTTPServer(self.health_addr, _health_handler(self))
+            threading.Thread(target=self.health_server.serve_forever, name="health", daemon=True).start()
+            host, port = self.health_server.server_address[:2]
+            print(f"🩺 Santé: http://{host}:{port}/health")
+
+    def stop(self, timeout: float = 120.0) -> None:
+        """Stop watching, let workers finish their current job, close the endpoint."""
+        from rate_control import interrupt_all
+
+        self._stop.set()
+        interrupt_all()  # réveille les workers en pause de rate limiting
+        for watcher in self.watchers:
+            watcher.stop()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        if self.health_server is not None:
+            self.health_server.shutdown()
+            self.health_server.server_close()
+            self.health_server = None
+
+    def health(self) -> dict:
+        alive = sum(t.is_alive() for t in self._threads)
+        healthy = (
+            not self._stop.is_set()
+            and alive == self.workers
+            and all(w.connected for w in self.watchers)
+        )
+        return {
+            "status": "ok" if healthy else "degraded",
+            "uptime_s": round(time.time() - self.started_at) if self.started_at else 0,
+            "imap": [w.status() for w in self.watchers],
+            "workers": {"alive": alive, "expected": self.workers},
+            "offers_received": self.offers_received,
+            "queue": self.queue.counts(),
+        }
+
+    def serve_forever(self) -> None:
+        """Start, then block until SIGTERM/SIGINT and shut down gracefully."""
+        def request_stop(signum, frame) -> None:
+            print(f"⏹  Signal {signum} reçu, arrêt en cours…")
+            self._stop.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+        self.start()
+        while not self._stop.wait(1.0):
+            pass
+        self.stop()
+        print("👋 Démon arrêté.")
+
+
+def _health_handler(daemon: PipelineDaemon) -> type[BaseHTTPRequestHandler]:
+    class HealthHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] not in ("/health", "/healthz"):
+                self.send_error(404)
+                return
+            report = daemon.health()
+            body = json.dumps(report).encode("utf-8")
+            self.send_response(200 if report["status"] == "ok" else 503)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass  # pas de log par requête de sonde
+
+    return HealthHandler
+
+
+def run_daemon(
+    queue_path: str = DEFAULT_QUEUE_PATH,
+    workers: int = DEFAULT_WORKERS,
+    health_host: str = "127.0.0.1",
+    health_port: int = DEFAULT_HEALTH_PORT,
+) -> int:
+    """Serve every configured account/folder pair (see mail_ingest.py) until stopped.
+
+    IDLE ties a connection to one folder, so each folder gets its own watcher.
+    """
+    from browser_governor import get_governor
+    from mail_ingest import load_accounts
+    from run_pipeline import HANDLERS
+
+    accounts = load_accounts()
+    get_governor().keep_warm = True
+    daemon = PipelineDaemon(WorkQueue(queue_path), HANDLERS, workers, (health_host, health_port))
+    for acc in accounts:
+        for folder in acc.folders:
+            daemon.watch(host=acc.host, port=acc.port, ssl=acc.ssl,
+                         username=acc.username, password=acc.password, folder=folder)
+    daemon.serve_forever()
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Démon Auto Scrap : IMAP IDLE + workers chauds")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="Base SQLite de la file de travail")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Nombre de workers (threads)")
+    parser.add_argument("--health-host", default="127.0.0.1", help="Adresse du point de santé")
+    parser.add_argument("--health-port", type=int, default=DEFAULT_HEALTH_PORT, help="Port du point de santé")
+    args = parser.parse_args()
+    return run_daemon(args.queue, args.workers, args.health_host, args.health_port)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
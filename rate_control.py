@@ -0,0 +1,242 @@
+"""Adaptive request pacing shared by the search and scrape steps.
+
+A :class:`RateController` replaces the fixed :func:`utils.polite_delay` sleep
+with an AIMD scheme: every clean response nudges the request rate up by a
+constant step, every block/CAPTCHA page or timeout divides it. Repeated
+failures open a circuit that pauses all traffic to the host for a cooldown,
+and :func:`process_with_requeue` puts the affected rows back in the queue
+instead of recording a miss for them. Rows still blocked after every attempt
+come back as :data:`BLOCKED`, so exports can tell them from real misses
+(see :func:`result_status`) and the next run can retry them.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable
+from typing import Any
+
+# Markers found in DuckDuckGo / Jobup challenge and rate-limit pages
+BLOCK_MARKERS = (
+    "anomaly-modal",
+    "bots use duckduckgo too",
+    "please complete the following challenge",
+    "cf-chl-",
+    "verify you are human",
+    "unusual traffic",
+    "too many requests",
+)
+
+STATUS_OK = "ok"
+STATUS_NOT_FOUND = "introuvable"
+STATUS_BLOCKED = "bloqué"
+
+
+class _Blocked:
+    """Type of :data:`BLOCKED`; falsy so ``result or default`` keeps working."""
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        return "BLOCKED"
+
+
+# Result of an item given up by process_with_requeue (distinct from None = not found)
+BLOCKED = _Blocked()
+
+
+class BlockedError(RuntimeError):
+    """Raised when the remote side served a block or CAPTCHA page."""
+
+
+class ThrottleTimeout(RuntimeError):
+    """Raised when a page did not load in time (treated as a soft block)."""
+
+
+class ThrottleInterrupted(RuntimeError):
+    """Raised by :meth:`RateController.wait` after :meth:`RateController.interrupt`."""
+
+
+def looks_blocked(page_source: str | None) -> bool:
+    """Return ``True`` if *page_source* looks like a block or CAPTCHA page."""
+    if not isinstance(page_source, str):
+        return False
+    lowered = page_source.lower()
+    return any(marker in lowered for marker in BLOCK_MARKERS)
+
+
+class RateController:
+    """AIMD rate limiter with a circuit breaker for a single remote host.
+
+    ``rate`` is expressed in requests per second. ``increase`` is added after
+    each success, ``rate`` is multiplied by ``decrease`` after each block or
+    timeout. After ``failure_threshold`` consecutive failures the circuit
+    opens for ``cooldown`` seconds (doubled on every re-open, capped at
+    ``max_cooldown``); the first request after the pause acts as a probe.
+
+    The waits happen outside the internal lock, so other threads can record
+    results meanwhile. By default they sleep on an event that
+    :meth:`interrupt` sets for shutdown.
+    """
+
+    def __init__(
+        self,
+        rate: float = 0.8,
+        min_rate: float = 0.05,
+        max_rate: float = 2.0,
+        increase: float = 0.05,
+        decrease: float = 0.5,
+        jitter: float = 0.25,
+        failure_threshold: int = 3,
+        cooldown: float = 60.0,
+        max_cooldown: float = 900.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Any] | None = None,
+    ) -> None:
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.jitter = jitter
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._clock = clock
+        self._interrupted = threading.Event()
+        self._sleep = sleep or self._interrupted.wait
+        self._cooldown = cooldown
+        self._consecutive_failures = 0
+        self._open_until: float | None = None
+        self._last_request: float | None = None
+        # Threads sharing a host (daemon workers) take turns
+        self._lock = threading.Lock()
+
+    @property
+    def interval(self) -> float:
+        """Current minimum spacing between two requests, in seconds."""
+        return 1.0 / self.rate
+
+    @property
+    def circuit_open(self) -> bool:
+        return self._open_until is not None and self._clock() < self._open_until
+
+    def retry_after(self) -> float:
+        """Seconds until the next request may go out: the rest of the pause
+        while the circuit is open, otherwise the current interval."""
+        with self._lock:
+            now = self._clock()
+            if self._open_until is not None and now < self._open_until:
+                return self._open_until - now
+            return self.interval
+
+    def wait(self) -> None:
+        """Block until the next request to the host is allowed.
+
+        The delay is computed and the request slot reserved under the lock;
+        the sleep itself happens without holding it.
+        """
+        with self._lock:
+            now = self._clock()
+            pause = 0.0
+            if self._open_until is not None and now < self._open_until:
+                pause = self._open_until - now
+            delay = pause
+            if self._last_request is not None:
+                spacing = self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+                delay = max(delay, self._last_request + spacing - now)
+            delay = max(0.0, delay)
+            self._last_request = now + delay
+        if pause:
+            print(f"⏸  Circuit ouvert, pause de {pause:.0f}s.")
+        if delay:
+            self._sleep(delay)
+        if self._interrupted.is_set():
+            raise ThrottleInterrupted("Attente interrompue (arrêt en cours).")
+
+    def interrupt(self) -> None:
+        """Wake up every thread sleeping in :meth:`wait` and refuse new waits."""
+        self._interrupted.set()
+
+    def record_success(self) -> None:
+        """Additive increase; closes the circuit after a successful probe."""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+            self._consecutive_failures = 0
+            self._open_until = None
+            self._cooldown = self.base_cooldown
+
+    def record_failure(self) -> None:
+        """Multiplicative decrease; opens the circuit past the threshold."""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.failure_threshold:
+                self._open_until = self._clock() + self._cooldown
+                self._cooldown = min(self.max_cooldown, self._cooldown * 2)
+                self._consecutive_failures = 0
+
+
+_CONTROLLERS: dict[str, RateController] = {}
+_CONTROLLERS_LOCK = threading.Lock()
+
+
+def controller_for(host: str) -> RateController:
+    """Return the process-wide :class:`RateController` for *host*."""
+    with _CONTROLLERS_LOCK:
+        ctrl = _CONTROLLERS.get(host)
+        if ctrl is None:
+            ctrl = _CONTROLLERS[host] = RateController()
+        return ctrl
+
+
+def interrupt_all() -> None:
+    """Interrupt and forget every registered controller (used on shutdown)."""
+    with _CONTROLLERS_LOCK:
+        controllers = list(_CONTROLLERS.values())
+        _CONTROLLERS.clear()
+    for ctrl in controllers:
+        ctrl.interrupt()
+
+
+def process_with_requeue(
+    items: Iterable[Any],
+    func: Callable[[Any], Any],
+    controller: RateController,
+    max_attempts: int = 4,
+) -> list[Any]:
+    """Apply *func* to every item, pacing calls through *controller*.
+
+    Items whose call raises :class:`BlockedError` or :class:`ThrottleTimeout`
+    are put back at the end of the queue and retried once the controller
+    allows it, up to ``max_attempts`` times; only then is :data:`BLOCKED`
+    recorded. Results are returned in the order of *items*.
+    """
+    items = list(items)
+    results: list[Any] = [None] * len(items)
+    queue = deque((idx, 1) for idx in range(len(items)))
+    while queue:
+        idx, attempt = queue.popleft()
+        controller.wait()
+        try:
+            results[idx] = func(items[idx])
+        except (BlockedError, ThrottleTimeout) as e:
+            controller.record_failure()
+            if attempt < max_attempts:
+                print(f"↩️  Remis en file ({attempt}/{max_attempts}): {e}")
+                queue.append((idx, attempt + 1))
+            else:
+                print(f"⚠️  Abandon après {attempt} tentatives: {e}")
+                results[idx] = BLOCKED
+            continue
+        controller.record_success()
+    return results
+
+
+def result_status(result: Any) -> str:
+    """Return the export status of a :func:`process_with_requeue` result."""
+    if result is BLOCKED:
+        return STATUS_BLOCKED
+    return STATUS_OK if result else STATUS_NOT_FOUND
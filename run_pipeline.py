@@ -15,6 +15,14 @@ Usage examples:
   python run_pipeline.py --to-step 4
   python run_pipeline.py --skip 1 --skip 2
   python run_pipeline.py --dry-run
+
+Distributed mode (shared SQLite work queue, see work_queue.py):
+  python run_pipeline.py --enqueue            # read alerts, enqueue the offers
+  python run_pipeline.py --worker             # claim & process jobs (any host)
+  python run_pipeline.py --collect            # export finished rows to Excel
+
+Service mode (IMAP IDLE + warm workers, see pipeline_daemon.py):
+  python run_pipeline.py --daemon
 """
 
 import argparse
@@ -22,6 +30,10 @@ import subprocess
 import sys
 from datetime import datetime
 
+from browser_governor import reap_orphans, watch_process_tree
+from fullenrich_scraper import BATCH_SIZE as ENRICH_BATCH_SIZE
+from work_queue import DEFAULT_QUEUE_PATH, RetryLater, WorkQueue, batched, enqueue_all, run_worker
+
 STEPS = [
     ("update_chromedriver.py", "Met à jour ChromeDriver"),
     ("email_jobup_reader.py", "Lit IMAP & extrait offres + contacts"),
@@ -32,11 +44,19 @@ STEPS = [
 
 PY = sys.executable or "python"
 
+# Job kinds of the distributed mode, in pipeline order. Every job of an offer
+# is keyed by its URL; each stage's result is the full row so far.
+STAGES = ["offer", "company", "profile", "enrich"]
+COLLECT_XLSX = "offres_jobup_enriched.xlsx"
+STATUS_COLUMN = "Statut"
+ERROR_COLUMN = "Erreur"
+
 def run_step(script: str) -> int:
     print(f"\n=== ▶ {script} ===")
     start = datetime.now()
     try:
-        proc = subprocess.run([PY, script], check=False)
+        proc = subprocess.Popen([PY, script])
+        peak = watch_process_tree(proc)
         code = proc.returncode
     except FileNotFoundError:
         print(f"❌ Script introuvable: {script}")
@@ -46,17 +66,150 @@ def run_step(script: str) -> int:
         return 1
     dur = (datetime.now() - start).total_seconds()
     status = "✅ OK" if code == 0 else f"❌ Exit {code}"
-    print(f"--- {status} ({dur:.1f}s) ---\n")
+    print(f"--- {status} ({dur:.1f}s, pic mémoire {peak / 2**20:.0f} Mo) ---\n")
     return code
 
+def _paced(host: str, func, *args):
+    """Call *func* through the adaptive rate controller of *host*.
+
+    A block or timeout is not the job's fault: the job is deferred until the
+    controller lets requests through again, without using up an attempt.
+    """
+    from rate_control import BlockedError, ThrottleTimeout, controller_for
+
+    ctrl = controller_for(host)
+    ctrl.wait()
+    try:
+        result = func(*args)
+    except (BlockedError, ThrottleTimeout) as e:
+        ctrl.record_failure()
+        raise RetryLater(str(e), ctrl.retry_after()) from e
+    ctrl.record_success()
+    return result
+
+def handle_offer(row: dict):
+    import email_jobup_reader as reader
+
+    chromedriver_path = reader.find_chromedriver_binary()
+    if not chromedriver_path:
+        raise RuntimeError("ChromeDriver introuvable.")
+    details = _paced("www.jobup.ch", reader.open_job_page_and_extract, row["URL Offre"], chromedriver_path, row)
+    row = {**row, **details}
+    return row, [("company", row["URL Offre"], row)]
+
+def handle_company(row: dict):
+    import linkedin_company_retriever as company
+    from url_canon import canonical_linkedin_url
+
+    name = (row.get("Entreprise (scrapée)") or "").strip()
+    url = _paced("duckduckgo.com", company.search_company_on_duckduckgo, name) if name else None
+    row = {**row, "LinkedIn Company URL": canonical_linkedin_url(url) if url else None}
+    return row, [("profile", row["URL Offre"], row)]
+
+def handle_profile(row: dict):
+    import linkedin_profile_retriever as profile
+    from url_canon import canonical_linkedin_url
+
+    name = (row.get("Entreprise (scrapée)") or "").strip()
+    url = _paced("duckduckgo.com", profile.find_ceo_profile, name) if name else None
+    row = {**row, "LinkedIn Profile URL": canonical_linkedin_url(url) if url else None}
+    if url and row["LinkedIn Profile URL"].startswith("https://www.linkedin.com/in/"):
+        return row, [("enrich", row["URL Offre"], row)]
+    return row, []
+
+@batched(ENRICH_BATCH_SIZE)
+def handle_enrich(rows: list[dict]):
+    """Enrich the available rows with one FullEnrich bulk request, like step 5."""
+    import pandas as pd
+    import fullenrich_scraper as fullenrich
+
+    enrichment_id = fullenrich.send_bulk_enrichment([row["LinkedIn Profile URL"] for row in rows])
+    results = fullenrich.retrieve_bulk_results(enrichment_id)
+    if not results:
+        raise RuntimeError("Aucun résultat FullEnrich.")
+    df = fullenrich.update_dataframe_with_results(pd.DataFrame(rows), results)
+    df = df.astype(object).where(df.notna(), None)
+    return [(row, []) for row in df.to_dict("records")]
+
+HANDLERS = {
+    "offer": handle_offer,
+    "company": handle_company,
+    "profile": handle_profile,
+    "enrich": handle_enrich,
+}
+
+def enqueue_offers(queue: WorkQueue) -> int:
+    from email_jobup_reader import open_alerts
+
+    with open_alerts() as alerts:
+        offers = list(alerts)
+        added = enqueue_all(queue, "offer", ((off["URL Offre"], off) for off in offers))
+        # Marquées lues seulement une fois les offres en file
+        alerts.ack()
+    print(f"📨 {added} nouvelle(s) offre(s) en file ({len(offers)} lues).")
+    return added
+
+def collect_results(queue: WorkQueue, output: str = COLLECT_XLSX) -> int:
+    """Export the most advanced row of every offer to *output*.
+
+    Offers whose next stage was given up are exported too, with the row as
+    it stood before that stage, ``Statut`` set to ``échec: <stage>`` and the
+    last error.
+    """
+    from excel_export import export_rows
+
+    rows: dict[str, dict] = {}
+    for kind in STAGES:
+        # l'étape la plus avancée l'emporte
+        for key, row in queue.results(kind):
+            rows[key] = {**row, STATUS_COLUMN: "ok", ERROR_COLUMN: None}
+        for key, payload, error in queue.failures(kind):
+            rows[key] = {**payload, STATUS_COLUMN: f"échec: {kind}", ERROR_COLUMN: error}
+    if not rows:
+        print("📭 Aucun résultat terminé dans la file.")
+        return 0
+    columns = [col for col in dict.fromkeys(col for row in rows.values() for col in row)
+               if col not in (STATUS_COLUMN, ERROR_COLUMN)]
+    columns += [STATUS_COLUMN, ERROR_COLUMN]
+    export_rows(rows.values(), output, columns)
+    print(f"✅ Export: {output} ({len(rows)} lignes)")
+    return len(rows)
+
 def main():
     parser = argparse.ArgumentParser(description="Orchestrateur Auto Scrap")
     parser.add_argument("--from-step", type=int, default=1, help="Commencer à l'étape N (1..5)")
     parser.add_argument("--to-step", type=int, default=len(STEPS), help="Terminer à l'étape N (1..5)")
     parser.add_argument("--skip", type=int, action="append", default=[], help="Étape(s) à ignorer (peut être répétée)")
     parser.add_argument("--dry-run", action="store_true", help="N'exécute rien, affiche seulement le plan")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="Base SQLite de la file de travail partagée")
+    parser.add_argument("--enqueue", action="store_true", help="Lit les alertes et met les offres en file")
+    parser.add_argument("--worker", action="store_true", help="Traite les travaux de la file (multi-process/multi-hôte)")
+    parser.add_argument("--kind", action="append", choices=STAGES, help="Types de travaux traités par ce worker (défaut: tous)")
+    parser.add_argument("--exit-when-idle", action="store_true", help="Le worker s'arrête quand la file est vide")
+    parser.add_argument("--collect", action="store_true", help="Exporte les lignes terminées de la file")
+    parser.add_argument("--daemon", action="store_true", help="Service continu: IMAP IDLE + workers chauds")
     args = parser.parse_args()
 
+    if args.daemon:
+        from pipeline_daemon import run_daemon
+
+        return run_daemon(args.queue)
+
+    if args.enqueue or args.worker or args.collect:
+        queue = WorkQueue(args.queue)
+        if args.enqueue:
+            enqueue_offers(queue)
+        if args.worker:
+            handlers = {kind: HANDLERS[kind] for kind in (args.kind or STAGES)}
+            try:
+                run_worker(queue, handlers, exit_when_idle=args.exit_when_idle)
+            except KeyboardInterrupt:
+                print("⏹  Worker arrêté.")
+        if args.collect:
+            collect_results(queue)
+        print(f"File: {queue.counts()}")
+        return 0
+
     if args.from_step < 1 or args.to_step > len(STEPS) or args.from_step > args.to_step:
         print("❌ Plage d'étapes invalide.")
         sys.exit(2)
@@ -78,11 +231,15 @@ def main():
     if args.dry_run:
         return 0
 
-    for idx, script, desc in plan:
-        code = run_step(script)
-        if code != 0:
-            print(f"Arrêt sur échec à l'étape {idx}.")
-            return code
+    reap_orphans()
+    try:
+        for idx, script, desc in plan:
+            code = run_step(script)
+            if code != 0:
+                print(f"Arrêt sur échec à l'étape {idx}.")
+                return code
+    finally:
+        reap_orphans()
 
     print("🎉 Pipeline terminé avec succès.")
     return 0
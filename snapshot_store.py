@@ -0,0 +1,122 @@
+"""Content-addressed, compressed store of fetched pages.
+
+Each snapshot is the final DOM of a page, gzip-compressed under
+``objects/<sha[:2]>/<sha>.html.gz`` where ``sha`` is the SHA-256 of the HTML,
+so identical pages are stored once. ``index.jsonl`` records one line per
+fetch: canonical URL, fetch time, kind (``offer``, ``search`` ...), digest
+and optional metadata. Extraction can then be re-run over stored pages
+without touching the network.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+DEFAULT_SNAPSHOT_DIR = "snapshots"
+
+
+@dataclass
+class Snapshot:
+    url: str
+    fetched_at: str
+    kind: str
+    sha256: str
+    meta: dict = field(default_factory=dict)
+
+
+class SnapshotStore:
+    """Append-only page store rooted at *root* (``SNAPSHOT_DIR`` by default)."""
+
+    def __init__(self, root: str | None = None) -> None:
+        self.root = root or os.getenv("SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR)
+        self.index_path = os.path.join(self.root, "index.jsonl")
+
+    def _object_path(self, sha: str) -> str:
+        return os.path.join(self.root, "objects", sha[:2], f"{sha}.html.gz")
+
+    def put(self, url: str, html: str, kind: str = "offer", meta: dict | None = None,
+            fetched_at: datetime | None = None) -> Snapshot:
+        """Store *html* fetched from canonical *url* and index the fetch."""
+        data = html.encode("utf-8")
+        sha = hashlib.sha256(data).hexdigest()
+        path = self._object_path(sha)
+        if not os.path.isfile(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as gz:
+                gz.write(data)
+            os.replace(tmp, path)
+        stamp = (fetched_at or datetime.now(timezone.utc)).isoformat(timespec="seconds")
+        snap = Snapshot(url, stamp, kind, sha, dict(meta or {}))
+        line = json.dumps(snap.__dict__, ensure_ascii=False, default=str) + "\n"
+        os.makedirs(self.root, exist_ok=True)
+        # Une seule écriture en mode append : les lignes ne s'entrelacent pas
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(line)
+        return snap
+
+    def get(self, sha: str) -> str:
+        """Return the HTML stored under digest *sha*."""
+        with gzip.open(self._object_path(sha), "rb") as f:
+            return f.read().decode("utf-8")
+
+    def iter_index(self, kind: str | None = None, since: str | None = None) -> Iterator[Snapshot]:
+        """Yield indexed fetches of *kind* fetched at or after *since* (ISO date)."""
+        if not os.path.isfile(self.index_path):
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    snap = Snapshot(**json.loads(line))
+                except (ValueError, TypeError):
+                    continue  # ligne tronquée par un arrêt brutal
+                if kind and snap.kind != kind:
+                    continue
+                if since and snap.fetched_at < since:
+                    continue
+                yield snap
+
+    def latest(self, kind: str | None = None, since: str | None = None) -> list[Snapshot]:
+        """Return the most recent snapshot of every URL, oldest URL first."""
+        latest: dict[str, Snapshot] = {}
+        for snap in self.iter_index(kind, since):
+            prev = latest.get(snap.url)
+            if prev is None or snap.fetched_at >= prev.fetched_at:
+                latest[snap.url] = snap
+        return list(latest.values())
+
+
+_STORE: SnapshotStore | None = None
+
+
+def get_store() -> SnapshotStore | None:
+    """Return the process-wide store, or ``None`` if ``SNAPSHOTS=0``."""
+    global _STORE
+    if os.getenv("SNAPSHOTS", "1") == "0":
+        return None
+    if _STORE is None:
+        _STORE = SnapshotStore()
+    return _STORE
+
+
+def save_snapshot(url: str, html: str, kind: str = "offer", meta: dict | None = None) -> Snapshot | None:
+    """Store a fetched page in the process-wide store, never raising.
+
+    Search result pages (``kind="search"``) are only kept when
+    ``SNAPSHOT_SEARCH=1``.
+    """
+    if kind == "search" and os.getenv("SNAPSHOT_SEARCH") != "1":
+        return None
+    store = get_store()
+    if store is None:
+        return None
+    try:
+        return store.put(url, html, kind, meta)
+    except OSError as e:
+        print(f"⚠️  Snapshot non enregistré ({url}): {e}")
+        return None
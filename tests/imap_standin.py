@@ -0,0 +1,169 @@
+"""Minimal in-process IMAP4rev1 server for tests.
+
+Speaks just enough of the protocol for IMAPClient: CAPABILITY, LOGIN,
+SELECT, UID SEARCH UNSEEN, UID FETCH (BODY[] or BODY.PEEK[]) of a UID set,
+UID STORE +FLAGS (\\Seen), IDLE/DONE, NOOP and LOGOUT. Messages are kept per
+folder; fetching ``BODY[]`` (not ``BODY.PEEK[]``) marks a message seen and
+:meth:`ImapStandIn.deliver` pushes ``EXISTS`` to idling clients. Setting
+``drop_on_fetch`` to *n* closes the connection on the *n*-th ``UID FETCH``.
+"""
+
+import socketserver
+import threading
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def setup(self) -> None:
+        super().setup()
+        self.folder: str | None = None
+        self.write_lock = threading.Lock()
+
+    def send(self, line: bytes) -> None:
+        with self.write_lock:
+            self.wfile.write(line)
+            self.wfile.flush()
+
+    def handle(self) -> None:
+        server: ImapStandIn = self.server  # type: ignore[assignment]
+        self.send(b"* OK IMAP4rev1 stand-in ready\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            tag, _, rest = line.rstrip(b"\r\n").partition(b" ")
+            command, _, args = rest.partition(b" ")
+            command = command.upper()
+            if command == b"UID":
+                command, _, args = args.partition(b" ")
+                command = b"UID " + command.upper()
+            server.commands.append(command.decode())
+            method = getattr(self, "do_" + command.decode().replace(" ", "_"), None)
+            if method is None:
+                self.send(tag + b" BAD unsupported\r\n")
+                continue
+            if method(tag, args) is False:
+                return
+
+    def do_CAPABILITY(self, tag: bytes, args: bytes) -> None:
+        caps = b"IMAP4rev1 IDLE" if self.server.idle else b"IMAP4rev1"
+        self.send(b"* CAPABILITY " + caps + b"\r\n" + tag + b" OK CAPABILITY completed\r\n")
+
+    def do_LOGIN(self, tag: bytes, args: bytes) -> None:
+        self.send(tag + b" OK LOGIN completed\r\n")
+
+    def do_SELECT(self, tag: bytes, args: bytes) -> None:
+        self.folder = args.decode().strip('"')
+        count = len(self.server.mailbox(self.folder))
+        self.send(
+            b"* FLAGS (\\Seen)\r\n"
+            + b"* %d EXISTS\r\n" % count
+            + b"* OK [UIDVALIDITY 1] UIDs valid\r\n"
+            + tag + b" OK [READ-WRITE] SELECT completed\r\n"
+        )
+
+    def do_NOOP(self, tag: bytes, args: bytes) -> None:
+        self.send(tag + b" OK NOOP completed\r\n")
+
+    def do_UID_SEARCH(self, tag: bytes, args: bytes) -> None:
+        with self.server.lock:
+            uids = [str(i + 1).encode() for i, (_, seen) in enumerate(self.server.mailbox(self.folder)) if not seen]
+        self.send(b"* SEARCH " + b" ".join(uids) + b"\r\n" + tag + b" OK SEARCH completed\r\n")
+
+    @staticmethod
+    def _uid_set(args: bytes) -> list[int]:
+        uids: list[int] = []
+        for part in args.split(b" ", 1)[0].split(b","):
+            first, _, last = part.partition(b":")
+            uids.extend(range(int(first), int(last or first) + 1))
+        return uids
+
+    def do_UID_FETCH(self, tag: bytes, args: bytes) -> bool | None:
+        server: ImapStandIn = self.server  # type: ignore[assignment]
+        if server.drop_on_fetch and server.commands.count("UID FETCH") >= server.drop_on_fetch:
+            return False
+        peek = b"BODY.PEEK[]" in args.upper()
+        out = b""
+        with server.lock:
+            box = server.mailbox(self.folder)
+            for uid in self._uid_set(args):
+                raw, seen = box[uid - 1]
+                seen = seen or not peek
+                box[uid - 1] = (raw, seen)
+                flags = b"\\Seen" if seen else b""
+                out += b"* %d FETCH (UID %d FLAGS (%s) BODY[] {%d}\r\n" % (uid, uid, flags, len(raw)) + raw + b")\r\n"
+        self.send(out + tag + b" OK FETCH completed\r\n")
+        return None
+
+    def do_UID_STORE(self, tag: bytes, args: bytes) -> None:
+        out = b""
+        with self.server.lock:
+            box = self.server.mailbox(self.folder)
+            for uid in self._uid_set(args):
+                raw, seen = box[uid - 1]
+                if b"\\SEEN" in args.upper():
+                    seen = not args.split(b" ")[1].startswith(b"-")
+                box[uid - 1] = (raw, seen)
+                flags = b"\\Seen" if seen else b""
+                out += b"* %d FETCH (UID %d FLAGS (%s))\r\n" % (uid, uid, flags)
+        self.send(out + tag + b" OK STORE completed\r\n")
+
+    def do_IDLE(self, tag: bytes, args: bytes) -> None:
+        self.send(b"+ idling\r\n")
+        with self.server.lock:
+            self.server.idlers.append(self)
+        try:
+            self.rfile.readline()  # DONE
+        finally:
+            with self.server.lock:
+                self.server.idlers.remove(self)
+        self.send(tag + b" OK IDLE terminated\r\n")
+
+    def do_LOGOUT(self, tag: bytes, args: bytes) -> bool:
+        self.send(b"* BYE logging out\r\n" + tag + b" OK LOGOUT completed\r\n")
+        return False
+
+
+class ImapStandIn(socketserver.ThreadingTCPServer):
+    """Plain-text IMAP server on ``127.0.0.1`` with an ephemeral port."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, idle: bool = True) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.idle = idle
+        self.lock = threading.Lock()
+        self.folders: dict[str, list[tuple[bytes, bool]]] = {}
+        self.idlers: list[_Handler] = []
+        self.commands: list[str] = []
+        self.drop_on_fetch: int | None = None
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def mailbox(self, folder: str | None) -> list[tuple[bytes, bool]]:
+        return self.folders.setdefault(folder or "INBOX", [])
+
+    def unseen(self, folder: str = "INBOX") -> int:
+        with self.lock:
+            return sum(not seen for _, seen in self.mailbox(folder))
+
+    def deliver(self, raw: bytes, folder: str = "INBOX") -> None:
+        """Append an unseen message to *folder* and notify idling clients."""
+        with self.lock:
+            box = self.mailbox(folder)
+            box.append((raw, False))
+            count = len(box)
+            idlers = [h for h in self.idlers if h.folder == folder]
+        for handler in idlers:
+            handler.send(b"* %d EXISTS\r\n" % count)
+
+    def __enter__(self) -> "ImapStandIn":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+        self.server_close()
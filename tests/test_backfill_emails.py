@@ -0,0 +1,80 @@
+import mailbox
+import os
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from email.message import EmailMessage
+from unittest import mock
+
+from backfill_emails import is_candidate, iter_offers, iter_raw_messages, parse_batch
+
+OFFER_ID = "0b6f6b1a-1234-4abc-9def-0123456789ab"
+
+
+def make_message(sender: str, subject: str, body: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = sender
+    msg["To"] = "me@example.com"
+    msg["Subject"] = subject
+    msg.set_content(body)
+    return msg
+
+
+ALERT_BODY = (
+    "Développeur Python\n"
+    f"https://www.jobup.ch/fr/emplois/detail/{OFFER_ID}/?utm_source=alert\n"
+    "Acme SA, Genève\n"
+    "Data Engineer\n"
+    "https://www.jobup.ch/de/stellenangebote/detail/11111111-2222-4333-8444-555555555555/\n"
+    "Beta AG, Zürich\n"
+)
+
+
+class BackfillTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.mbox_path = os.path.join(self.tmp.name, "alerts.mbox")
+        box = mailbox.mbox(self.mbox_path)
+        box.add(make_message("Jobup <noreply@jobup.ch>", "Nouvelles offres d'emploi", ALERT_BODY))
+        box.add(make_message("Jobup <noreply@jobup.ch>", "Job alert", ALERT_BODY))
+        box.add(make_message("friend@example.com", "jobs", ALERT_BODY))
+        box.close()
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_reads_mbox_and_eml_directory(self) -> None:
+        raws = list(iter_raw_messages(self.mbox_path))
+        self.assertEqual(len(raws), 3)
+        eml_dir = os.path.join(self.tmp.name, "eml")
+        os.makedirs(os.path.join(eml_dir, "sub"))
+        for i, raw in enumerate(raws):
+            with open(os.path.join(eml_dir, "sub", f"{i}.eml"), "wb") as f:
+                f.write(raw)
+        self.assertEqual(list(iter_raw_messages(eml_dir)), raws)
+
+    def test_prefilter_uses_headers_only(self) -> None:
+        raws = list(iter_raw_messages(self.mbox_path))
+        self.assertEqual([is_candidate(r) for r in raws], [True, True, False])
+
+    def test_offers_are_parsed_in_pool_and_deduplicated(self) -> None:
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            offers = list(iter_offers(iter_raw_messages(self.mbox_path), executor, batch_size=1))
+        self.assertEqual(
+            [o["URL Offre"] for o in offers],
+            [
+                f"https://www.jobup.ch/fr/emplois/detail/{OFFER_ID}/",
+                "https://www.jobup.ch/fr/emplois/detail/11111111-2222-4333-8444-555555555555/",
+            ],
+        )
+        self.assertEqual(offers[0]["Entreprise (mail)"], "Acme SA")
+
+    def test_unreadable_messages_are_counted(self) -> None:
+        raws = list(iter_raw_messages(self.mbox_path))
+        with mock.patch("backfill_emails.offers_from_message", side_effect=[ValueError("boom"), []]):
+            offers, errors = parse_batch(raws[:2])
+        self.assertEqual((offers, errors), ([], ["ValueError: boom"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,214 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+from browser_governor import (
+    OWNER_FLAG,
+    BrowserBudgetExceeded,
+    BrowserGovernor,
+    reap_orphans,
+    watch_process_tree,
+)
+
+
+class FakeProcess:
+    def __init__(self) -> None:
+        self.returncode: int | None = None
+
+    def poll(self) -> int | None:
+        return self.returncode
+
+
+class FakeService:
+    def __init__(self) -> None:
+        self.process = FakeProcess()
+
+
+class FakeDriver:
+    def __init__(self) -> None:
+        self.quit_called = False
+        self.crashed = False
+        self.service = FakeService()
+
+    @property
+    def current_url(self) -> str:
+        if self.crashed:
+            raise RuntimeError("session deleted because of page crash")
+        return "about:blank"
+
+    def quit(self) -> None:
+        self.quit_called = True
+
+
+class FakeOptions:
+    def __init__(self, *arguments: str) -> None:
+        self.arguments = list(arguments)
+
+    def add_argument(self, arg: str) -> None:
+        self.arguments.append(arg)
+
+
+def warm_driver(gov: BrowserGovernor, *arguments: str) -> FakeDriver:
+    """Register a driver as if ``acquire(FakeOptions(*arguments))`` had started it."""
+    driver = FakeDriver()
+    gov._busy[id(driver)] = driver
+    gov._kinds[id(driver)] = tuple(arguments)
+    return driver
+
+
+class BrowserGovernorTests(unittest.TestCase):
+    def test_release_quits_unless_kept_warm(self) -> None:
+        cold = BrowserGovernor(rss_budget_mb=100, max_instances=2)
+        driver = FakeDriver()
+        cold._busy[id(driver)] = driver
+        cold.release(driver)
+        self.assertTrue(driver.quit_called)
+        self.assertEqual(cold.instances, 0)
+
+        warm = BrowserGovernor(rss_budget_mb=100, max_instances=2, keep_warm=True)
+        driver = FakeDriver()
+        warm._busy[id(driver)] = driver
+        warm.release(driver)
+        self.assertFalse(driver.quit_called)
+        self.assertEqual(warm.instances, 1)
+        warm.shutdown()
+        self.assertTrue(driver.quit_called)
+
+    def test_dead_or_failed_drivers_are_not_kept_warm(self) -> None:
+        gov = BrowserGovernor(rss_budget_mb=100, max_instances=3, keep_warm=True)
+        crashed = warm_driver(gov)
+        crashed.crashed = True
+        gov.release(crashed)
+        exited = warm_driver(gov)
+        exited.service.process.returncode = 1
+        gov.release(exited)
+        failed = warm_driver(gov)
+        gov.release(failed, healthy=False)
+        self.assertTrue(crashed.quit_called and exited.quit_called and failed.quit_called)
+        self.assertEqual(gov.instances, 0)
+
+    def test_warm_driver_only_serves_same_options(self) -> None:
+        gov = BrowserGovernor(rss_budget_mb=100, max_instances=2, keep_warm=True)
+        jobup = warm_driver(gov, "--lang=fr-FR")
+        gov.release(jobup)
+        self.assertIs(gov.acquire(FakeOptions("--lang=fr-FR"), "chromedriver"), jobup)
+        gov.release(jobup)
+        self.assertIsNone(gov._take_idle(("--lang=en-US",)))
+        self.assertEqual(gov.instances, 1)
+
+    def test_refuses_past_max_instances_after_timeout(self) -> None:
+        gov = BrowserGovernor(rss_budget_mb=100, max_instances=1, acquire_timeout=0.2)
+        busy = FakeDriver()
+        gov._busy[id(busy)] = busy
+        started = time.monotonic()
+        with self.assertRaises(BrowserBudgetExceeded):
+            gov.acquire(object(), "chromedriver")
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+    def test_acquire_waits_for_a_released_driver(self) -> None:
+        gov = BrowserGovernor(rss_budget_mb=100, max_instances=1, keep_warm=True, acquire_timeout=5)
+        busy = warm_driver(gov, "--lang=fr-FR")
+        got: list[object] = []
+        waiter = threading.Thread(target=lambda: got.append(gov.acquire(FakeOptions("--lang=fr-FR"), "cd")))
+        waiter.start()
+        time.sleep(0.1)
+        self.assertEqual(got, [])
+        gov.release(busy)
+        waiter.join(timeout=5)
+        self.assertEqual(got, [busy])
+
+    def test_warm_driver_is_probed_before_reuse(self) -> None:
+        gov = BrowserGovernor(rss_budget_mb=100, max_instances=2, keep_warm=True)
+        live = warm_driver(gov, "--lang=fr-FR")
+        died = warm_driver(gov, "--lang=fr-FR")
+        gov.release(live)
+        gov.release(died)
+        died.crashed = True  # mort entre deux rafales
+        self.assertIs(gov.acquire(FakeOptions("--lang=fr-FR"), "chromedriver"), live)
+        self.assertTrue(died.quit_called)
+        self.assertEqual(gov.instances, 1)
+
+    def test_idle_drivers_expire(self) -> None:
+        gov = BrowserGovernor(rss_budget_mb=100, max_instances=2, keep_warm=True, max_idle=0.05)
+        stale = warm_driver(gov)
+        gov.release(stale)
+        time.sleep(0.1)
+        fresh = warm_driver(gov)
+        gov.release(fresh)
+        self.assertTrue(stale.quit_called)
+        self.assertFalse(fresh.quit_called)
+        self.assertEqual(gov.instances, 1)
+
+    def test_drivers_are_quit_outside_the_lock(self) -> None:
+        gov = BrowserGovernor(rss_budget_mb=100, max_instances=2)
+        driver = warm_driver(gov)
+        other_thread_got_lock: list[bool] = []
+        instances_during_quit: list[int] = []
+
+        def quit() -> None:
+            def probe() -> None:
+                got = gov._lock.acquire(timeout=1)
+                other_thread_got_lock.append(got)
+                if got:
+                    gov._lock.release()
+
+            prober = threading.Thread(target=probe)
+            prober.start()
+            prober.join()
+            instances_during_quit.append(gov.instances)
+
+        driver.quit = quit
+        gov.release(driver)
+        self.assertEqual(other_thread_got_lock, [True])
+        # La place reste occupée jusqu'à la fin de l'arrêt
+        self.assertEqual((instances_during_quit, gov.instances), ([1], 0))
+
+    def test_reap_kills_process_of_dead_owner(self) -> None:
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        orphan = subprocess.Popen(
+            [sys.executable, "-c", "import time; time.sleep(60)", f"{OWNER_FLAG}={dead.pid}"]
+        )
+        try:
+            self.assertGreaterEqual(reap_orphans(), 1)
+            self.assertIsNotNone(orphan.wait(timeout=10))
+        finally:
+            if orphan.poll() is None:
+                orphan.kill()
+
+    def reap_drivers(self, *drivers: tuple[str, int], pid: int = 4242) -> list[str]:
+        """Run reap_orphans over fake chromedriver processes and return the killed exes."""
+        procs = [
+            mock.Mock(info={"pid": 1000 + i, "name": "chromedriver", "exe": exe, "cmdline": [exe, "--port=0"],
+                            "ppid": ppid, "username": None})
+            for i, (exe, ppid) in enumerate(drivers)
+        ]
+        with mock.patch("os.getpid", return_value=pid), \
+                mock.patch("psutil.Process", return_value=mock.Mock(**{"username.return_value": None})), \
+                mock.patch("psutil.process_iter", return_value=procs), \
+                mock.patch("psutil.pid_exists", side_effect=lambda p: p in (1, pid)), \
+                mock.patch("browser_governor._kill_procs") as kill:
+            reap_orphans()
+        return [p.info["exe"] for p in (kill.call_args[0][0] if kill.called else [])]
+
+    def test_reap_only_kills_provisioned_chromedriver(self) -> None:
+        ours = os.path.abspath(os.path.join("chromedriver", "chromedriver-linux64", "chromedriver"))
+        foreign = "/usr/bin/chromedriver"
+        self.assertEqual(self.reap_drivers((ours, 1), (foreign, 1), (ours, 99999)), [ours, ours])
+
+    def test_reap_keeps_own_drivers_when_running_as_pid_1(self) -> None:
+        ours = os.path.abspath(os.path.join("chromedriver", "chromedriver"))
+        self.assertEqual(self.reap_drivers((ours, 1), (ours, 99999), pid=1), [ours])
+
+    def test_watch_process_tree_reports_peak(self) -> None:
+        proc = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(0.3)"])
+        self.assertGreater(watch_process_tree(proc, interval=0.05), 0)
+        self.assertEqual(proc.returncode, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
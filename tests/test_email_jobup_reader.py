@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import email_jobup_reader as reader
+import snapshot_store
+from excel_export import read_export
+from rate_control import BlockedError, RateController
+
+FIRST = "https://www.jobup.ch/fr/emplois/detail/0b6f6b1a-1234-4abc-9def-0123456789ab/"
+SECOND = "https://www.jobup.ch/fr/emplois/detail/11111111-2222-4333-8444-555555555555/"
+
+
+def offer(url: str, title: str) -> dict:
+    return {"Titre Offre": title, "Entreprise (mail)": "Acme SA", "Localisation": "Genève", "URL Offre": url}
+
+
+class ScrapeAndExportTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.output = os.path.join(self.tmp.name, "offres.xlsx")
+        ctrl = RateController(jitter=0, sleep=lambda s: None)
+        patcher = mock.patch.object(reader, "controller_for", return_value=ctrl)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_step(self, offers: list[dict], blocked: set[str]) -> dict:
+        def extract(url: str, chromedriver_path: str, meta: dict) -> dict:
+            if url in blocked:
+                raise BlockedError("challenge")
+            return {"Contact Offre": "Jane", "Téléphone Offre": None, "Entreprise (scrapée)": "Acme SA"}
+
+        with mock.patch.object(reader, "open_job_page_and_extract", side_effect=extract):
+            reader.scrape_and_export(offers, "chromedriver", self.output)
+        df = read_export(self.output)
+        return dict(zip(df["URL Offre"], df[reader.STATUS_COLUMN]))
+
+    def test_blocked_offers_are_exported_as_such_and_retried(self) -> None:
+        statuses = self.run_step([offer(FIRST, "Dev"), offer(SECOND, "Ops")], blocked={SECOND})
+        self.assertEqual(statuses, {FIRST: "ok", SECOND: "bloqué"})
+        self.assertEqual([off["Titre Offre"] for off in reader.blocked_offers(self.output)], ["Ops"])
+
+        # Passage suivant sans nouvelle alerte : l'offre bloquée est relancée
+        statuses = self.run_step([], blocked=set())
+        self.assertEqual(statuses, {SECOND: "ok"})
+        self.assertEqual(reader.blocked_offers(self.output), [])
+
+    def test_reextract_keeps_blocked_rows(self) -> None:
+        with mock.patch.dict(os.environ, {"SNAPSHOT_DIR": os.path.join(self.tmp.name, "snaps"), "SNAPSHOTS": "1"}), \
+                mock.patch("snapshot_store._STORE", None):
+            self.run_step([offer(FIRST, "Dev"), offer(SECOND, "Ops")], blocked={SECOND})
+            # Seule la page chargée a un snapshot
+            snapshot_store.get_store().put(FIRST, "<html><body>Dev</body></html>", "offer", offer(FIRST, "Dev"))
+            reader.reextract_from_snapshots(output=self.output)
+        df = read_export(self.output)
+        self.assertEqual(dict(zip(df["URL Offre"], df[reader.STATUS_COLUMN])), {FIRST: "ok", SECOND: "bloqué"})
+        self.assertEqual([off["Titre Offre"] for off in reader.blocked_offers(self.output)], ["Ops"])
+
+
+if __name__ == "__main__":
+    unittest.main()
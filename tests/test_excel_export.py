@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from excel_export import export_dataframe, export_rows, read_export
+
+
+class ExcelExportTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "out.xlsx")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_roundtrip_with_missing_values(self) -> None:
+        df = pd.DataFrame({"URL Offre": ["a", "b"], "Téléphone Offre": [None, "+41 22"]})
+        self.assertEqual(export_dataframe(df, self.path, chunk_size=1), [self.path])
+        back = read_export(self.path)
+        self.assertEqual(back["URL Offre"].tolist(), ["a", "b"])
+        self.assertTrue(pd.isna(back.loc[0, "Téléphone Offre"]))
+
+    def test_shards_into_sheets_and_files(self) -> None:
+        df = pd.DataFrame({"n": range(25)})
+        files = export_dataframe(df, self.path, rows_per_sheet=5, rows_per_file=10)
+        self.assertEqual([os.path.basename(f) for f in files],
+                         ["out.xlsx", "out.part2.xlsx", "out.part3.xlsx"])
+        self.assertEqual(load_workbook(self.path, read_only=True).sheetnames, ["Sheet1", "Sheet2"])
+        self.assertEqual(read_export(self.path)["n"].tolist(), list(range(25)))
+
+    def test_append_only_touches_last_shard(self) -> None:
+        export_dataframe(pd.DataFrame({"n": range(15)}), self.path, rows_per_file=10)
+        first_mtime = os.stat(self.path).st_mtime_ns
+        files = export_dataframe(pd.DataFrame({"n": [100, 101]}), self.path, append=True, rows_per_file=10)
+        self.assertEqual([os.path.basename(f) for f in files], ["out.part2.xlsx"])
+        self.assertEqual(os.stat(self.path).st_mtime_ns, first_mtime)
+        self.assertEqual(read_export(self.path)["n"].tolist(), list(range(15)) + [100, 101])
+
+    def test_append_rejects_unknown_columns(self) -> None:
+        export_dataframe(pd.DataFrame({"a": [1]}), self.path)
+        with self.assertRaises(ValueError):
+            export_dataframe(pd.DataFrame({"b": [2]}), self.path, append=True)
+
+    def test_export_rows_streams_dicts(self) -> None:
+        rows = ({"a": i, "b": str(i)} for i in range(3))
+        export_rows(rows, self.path, ["b", "a"])
+        self.assertEqual(read_export(self.path).columns.tolist(), ["b", "a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STEP_MODULES = [
+    "utils",
+    "update_chromedriver",
+    "email_jobup_reader",
+    "snapshot_store",
+    "linkedin_company_retriever",
+    "linkedin_profile_retriever",
+    "fullenrich_scraper",
+    "run_pipeline",
+    "pipeline_daemon",
+    "mail_ingest",
+]
+
+HEAVY = ("selenium", "pandas", "openpyxl", "imapclient", "pyzmail", "bs4", "requests", "psutil")
+
+
+class LazyImportTests(unittest.TestCase):
+    def test_step_modules_import_without_heavy_dependencies(self) -> None:
+        code = (
+            "import sys\n"
+            f"for name in {STEP_MODULES!r}:\n"
+            "    __import__(name)\n"
+            f"print(','.join(m for m in {HEAVY!r} if m in sys.modules))\n"
+        )
+        env = {**os.environ, "FULLENRICH_API_KEY": "", "CHROMEDRIVER": ""}
+        proc = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True
+        )
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        self.assertEqual(proc.stdout.strip(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
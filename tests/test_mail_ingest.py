@@ -0,0 +1,187 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from email.message import EmailMessage
+from unittest import mock
+
+from imap_standin import ImapStandIn
+import run_pipeline
+from mail_ingest import Account, AlertBatch, ImapPool, fetch_folder, load_accounts
+from work_queue import WorkQueue
+
+GE = "0b6f6b1a-1234-4abc-9def-0123456789ab"
+ZH = "11111111-2222-4333-8444-555555555555"
+VD = "22222222-3333-4444-8555-666666666666"
+
+
+def alert(*offers: tuple[str, str]) -> bytes:
+    msg = EmailMessage()
+    msg["From"] = "Jobup <noreply@jobup.ch>"
+    msg["To"] = "me@example.com"
+    msg["Subject"] = "Job alert"
+    msg.set_content("".join(
+        f"{title}\nhttps://www.jobup.ch/fr/emplois/detail/{offer_id}/?utm_source=alert\nAcme SA, Genève\n"
+        for title, offer_id in offers
+    ))
+    return msg.as_bytes()
+
+
+def read_alerts(accounts: list[Account], ack: bool = True) -> list[dict]:
+    with AlertBatch(accounts) as alerts:
+        offers = list(alerts)
+        if ack:
+            alerts.ack()
+    return offers
+
+
+def account(name: str, imap: ImapStandIn, folders: list[str], connections: int = 2) -> Account:
+    return Account(name, f"{name}@example.com", "secret", folders, "127.0.0.1", imap.port, False, connections)
+
+
+class LoadAccountsTests(unittest.TestCase):
+    def test_reads_accounts_and_passwords_from_env(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "mailboxes.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"accounts": [
+                    {"name": "ge", "username": "ge@gmail.com", "password_env": "PW_GE",
+                     "folders": ["INBOX", "Jobup/Genève"]},
+                    {"username": "zh@example.ch", "password_env": "PW_ZH", "host": "imap.example.ch",
+                     "port": 1993, "connections": 3},
+                ]}, f)
+            with mock.patch.dict(os.environ, {"PW_GE": "a", "PW_ZH": "b"}):
+                accounts = load_accounts(path)
+        self.assertEqual([a.name for a in accounts], ["ge", "zh@example.ch"])
+        self.assertEqual(accounts[0].folders, ["INBOX", "Jobup/Genève"])
+        self.assertEqual(accounts[0].host, "imap.gmail.com")
+        self.assertEqual((accounts[1].folders, accounts[1].port, accounts[1].connections), (["INBOX"], 1993, 3))
+        self.assertEqual((accounts[0].password, accounts[1].password), ("a", "b"))
+        self.assertNotIn("password", repr(accounts[0]))
+
+    def test_missing_password_is_an_error(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "mailboxes.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"accounts": [{"username": "x@gmail.com", "password_env": "PW_MISSING"}]}, f)
+            with mock.patch.dict(os.environ):
+                os.environ.pop("PW_MISSING", None)
+                with self.assertRaises(RuntimeError):
+                    load_accounts(path)
+
+
+class IngestTests(unittest.TestCase):
+    def test_folders_and_accounts_are_merged_and_deduplicated(self) -> None:
+        with ImapStandIn() as first, ImapStandIn() as second:
+            first.deliver(alert(("Dev GE", GE), ("Dev ZH", ZH)), "INBOX")
+            first.deliver(alert(("Dev GE again", GE)), "Jobup/Genève")
+            second.deliver(alert(("Dev ZH", ZH), ("Dev VD", VD)), "Alerts")
+            offers = read_alerts([
+                account("ge", first, ["INBOX", "Jobup/Genève"]),
+                account("zh", second, ["Alerts"]),
+            ])
+        urls = [off["URL Offre"] for off in offers]
+        self.assertEqual(len(urls), len(set(urls)))
+        self.assertEqual(
+            sorted(urls),
+            sorted(f"https://www.jobup.ch/fr/emplois/detail/{i}/" for i in (GE, ZH, VD)),
+        )
+
+    def test_pool_reuses_connections_across_folders(self) -> None:
+        with ImapStandIn() as imap:
+            folders = [f"F{i}" for i in range(5)]
+            for i, folder in enumerate(folders):
+                for _ in range(3):
+                    imap.deliver(alert((f"Job {i}", GE)), folder)
+            pool = ImapPool(account("ge", imap, folders, connections=2))
+            try:
+                results = [fetch_folder(pool, folder)[0] for folder in folders]
+            finally:
+                pool.close()
+            self.assertEqual(pool.opened, 1)
+            self.assertEqual([len(r) for r in results], [3] * 5)
+            self.assertEqual(imap.commands.count("LOGIN"), 1)
+            # Un seul FETCH par dossier grâce aux lots
+            self.assertEqual(imap.commands.count("UID FETCH"), 5)
+
+    def test_messages_are_marked_seen_only_on_ack(self) -> None:
+        with ImapStandIn() as imap:
+            imap.deliver(alert(("Dev GE", GE)))
+            imap.deliver(alert(("Dev ZH", ZH)), "Alerts")
+            with AlertBatch([account("ge", imap, ["INBOX", "Alerts"])]) as alerts:
+                self.assertEqual(len(list(alerts)), 2)
+                self.assertEqual(imap.unseen() + imap.unseen("Alerts"), 2)
+                self.assertEqual(alerts.ack(), 2)
+            self.assertEqual(imap.unseen() + imap.unseen("Alerts"), 0)
+            self.assertIn("UID STORE", imap.commands)
+
+    def test_unreadable_message_does_not_drop_folder(self) -> None:
+        broken = (
+            b"From: Jobup <noreply@jobup.ch>\r\nSubject: Job alert\r\nMIME-Version: 1.0\r\n"
+            b"Content-Type: text/plain; charset=x-unknown-charset\r\n\r\n"
+            b"Dev ZH\r\nhttps://www.jobup.ch/fr/emplois/detail/" + ZH.encode() + b"/\r\nAcme SA, Zurich\r\n"
+        )
+        with ImapStandIn() as imap:
+            imap.deliver(alert(("Dev GE", GE)))
+            imap.deliver(broken)
+            with mock.patch("email_jobup_reader.offers_from_message", side_effect=[[{"URL Offre": GE}], ValueError("boom")]):
+                pool = ImapPool(account("ge", imap, ["INBOX"]))
+                try:
+                    offers, uids = fetch_folder(pool, "INBOX")
+                finally:
+                    pool.close()
+            # Le message illisible n'est pas à marquer lu
+            self.assertEqual((offers, uids), ([{"URL Offre": GE}], [1]))
+            # Un charset inconnu n'est pas une erreur d'analyse
+            offers = read_alerts([account("ge", imap, ["INBOX"])])
+            self.assertEqual([off["Titre Offre"] for off in offers], ["Dev GE", "Dev ZH"])
+            self.assertEqual(imap.unseen(), 0)
+
+    def test_dropped_connection_leaves_messages_unseen(self) -> None:
+        with ImapStandIn() as imap:
+            for i in range(60):  # deux lots
+                imap.deliver(alert((f"Job {i}", GE)))
+            imap.drop_on_fetch = 2
+            offers = read_alerts([account("ge", imap, ["INBOX"])])
+            self.assertEqual(offers, [])
+            self.assertEqual(imap.unseen(), 60)
+            imap.drop_on_fetch = None
+            offers = read_alerts([account("ge", imap, ["INBOX"])])
+            self.assertEqual(len(offers), 1)
+            self.assertEqual(imap.unseen(), 0)
+
+    def test_failed_enqueue_leaves_alerts_unseen(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp, ImapStandIn() as imap:
+            imap.deliver(alert(("Dev GE", GE), ("Dev ZH", ZH)))
+            queue = WorkQueue(os.path.join(tmp, "queue.sqlite3"))
+            accounts = [account("ge", imap, ["INBOX"])]
+            with mock.patch("mail_ingest.load_accounts", return_value=accounts):
+                with mock.patch.object(queue, "enqueue", side_effect=sqlite3.OperationalError("database is locked")):
+                    with self.assertRaises(sqlite3.OperationalError):
+                        run_pipeline.enqueue_offers(queue)
+                self.assertEqual(imap.unseen(), 1)
+                self.assertNotIn("UID STORE", imap.commands)
+                self.assertEqual(run_pipeline.enqueue_offers(queue), 2)
+            self.assertEqual(imap.unseen(), 0)
+
+    def test_concurrent_fetch_respects_pool_size(self) -> None:
+        with ImapStandIn() as imap:
+            folders = [f"F{i}" for i in range(6)]
+            for folder in folders:
+                imap.deliver(alert(("Job", GE)), folder)
+            offers = read_alerts([account("ge", imap, folders, connections=2)])
+            self.assertEqual(len(offers), 1)
+            self.assertLessEqual(imap.commands.count("LOGIN"), 2)
+
+    def test_failing_account_does_not_block_others(self) -> None:
+        with ImapStandIn() as down:
+            dead = account("down", down, ["INBOX"])
+        with ImapStandIn() as imap:
+            imap.deliver(alert(("Dev VD", VD)))
+            offers = read_alerts([dead, account("vd", imap, ["INBOX"])])
+        self.assertEqual([off["Titre Offre"] for off in offers], ["Dev VD"])
+
+
+if __name__ == "__main__":
+    unittest.main()
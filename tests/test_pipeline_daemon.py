@@ -0,0 +1,153 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from email.message import EmailMessage
+
+from imap_standin import ImapStandIn
+from pipeline_daemon import ImapWatcher, PipelineDaemon
+from work_queue import WorkQueue
+
+FIRST = "0b6f6b1a-1234-4abc-9def-0123456789ab"
+SECOND = "11111111-2222-4333-8444-555555555555"
+
+
+def alert(offer_id: str, title: str) -> bytes:
+    msg = EmailMessage()
+    msg["From"] = "Jobup <noreply@jobup.ch>"
+    msg["To"] = "me@example.com"
+    msg["Subject"] = "Job alert"
+    msg.set_content(f"{title}\nhttps://www.jobup.ch/fr/emplois/detail/{offer_id}/\nAcme SA, Genève\n")
+    return msg.as_bytes()
+
+
+def wait_for(predicate, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def get_health(port: int) -> tuple[int, dict]:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=5) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+class PipelineDaemonTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.queue = WorkQueue(os.path.join(self.tmp.name, "queue.sqlite3"))
+        self.processed: list[str] = []
+        self.lock = threading.Lock()
+
+    def handle_offer(self, row: dict):
+        with self.lock:
+            self.processed.append(row["Titre Offre"])
+        return row, []
+
+    def make_daemon(self, imap: ImapStandIn, **watch) -> PipelineDaemon:
+        daemon = PipelineDaemon(
+            self.queue, {"offer": self.handle_offer}, workers=2,
+            health_addr=("127.0.0.1", 0), poll_interval=0.05,
+        )
+        daemon.watch(host="127.0.0.1", port=imap.port, ssl=False, username="u", password="p",
+                     idle_check=0.1, **watch)
+        return daemon
+
+    def test_backlog_then_idle_push_is_processed_within_seconds(self) -> None:
+        with ImapStandIn() as imap:
+            imap.deliver(alert(FIRST, "Backlog"))
+            daemon = self.make_daemon(imap)
+            daemon.start()
+            try:
+                self.assertTrue(wait_for(lambda: self.processed == ["Backlog"]))
+                self.assertTrue(wait_for(lambda: "IDLE" in imap.commands))
+                started = time.monotonic()
+                imap.deliver(alert(SECOND, "Pushed"))
+                self.assertTrue(wait_for(lambda: "Pushed" in self.processed, timeout=5))
+                self.assertLess(time.monotonic() - started, 5)
+                imap.deliver(alert(SECOND, "Duplicate"))  # même URL canonique
+                self.assertTrue(wait_for(lambda: daemon.offers_received == 3))
+            finally:
+                daemon.stop(timeout=10)
+            self.assertEqual(sorted(self.processed), ["Backlog", "Pushed"])
+            self.assertTrue(wait_for(lambda: "LOGOUT" in imap.commands, timeout=5))
+        self.assertEqual(self.queue.counts(), {"done": 2})
+
+    def test_health_endpoint_reports_state(self) -> None:
+        with ImapStandIn() as imap:
+            daemon = self.make_daemon(imap)
+            daemon.start()
+            port = daemon.health_server.server_address[1]
+            try:
+                self.assertTrue(wait_for(lambda: daemon.watchers[0].connected))
+                status, report = get_health(port)
+                self.assertEqual(status, 200)
+                self.assertEqual(report["status"], "ok")
+                self.assertEqual(report["workers"], {"alive": 2, "expected": 2})
+                self.assertTrue(report["imap"][0]["connected"])
+            finally:
+                daemon.stop(timeout=10)
+        self.assertIsNone(daemon.health_server)
+        self.assertEqual(daemon.health()["status"], "degraded")
+
+    def test_polls_when_server_lacks_idle(self) -> None:
+        with ImapStandIn(idle=False) as imap:
+            daemon = self.make_daemon(imap, poll_interval=0.1)
+            daemon.start()
+            try:
+                self.assertTrue(wait_for(lambda: daemon.watchers[0].connected))
+                imap.deliver(alert(FIRST, "Polled"))
+                self.assertTrue(wait_for(lambda: self.processed == ["Polled"]))
+            finally:
+                daemon.stop(timeout=10)
+            self.assertNotIn("IDLE", imap.commands)
+
+    def test_alerts_stay_unseen_until_enqueued(self) -> None:
+        received: list[list[dict]] = []
+
+        def on_offers(offers: list[dict]) -> None:
+            received.append(offers)
+            if len(received) == 1:
+                raise OSError("queue unavailable")
+
+        with ImapStandIn() as imap:
+            imap.deliver(alert(FIRST, "Backlog"))
+            watcher = ImapWatcher(on_offers, "127.0.0.1", "u", "p", port=imap.port, ssl=False, idle_check=0.1)
+            watcher.start()
+            try:
+                # Échec de mise en file : message non marqué lu, relu après reconnexion
+                self.assertTrue(wait_for(lambda: len(received) == 2))
+                self.assertTrue(wait_for(lambda: imap.unseen() == 0))
+            finally:
+                watcher.stop()
+        self.assertEqual(watcher.errors, 1)
+        self.assertEqual(received[0], received[1])
+
+    def test_connection_failures_are_retried_and_reported(self) -> None:
+        with ImapStandIn() as imap:
+            port = imap.port
+        # Serveur arrêté : le watcher compte l'échec et réessaie avec backoff
+        daemon = PipelineDaemon(self.queue, {"offer": self.handle_offer}, workers=1, health_addr=None)
+        watcher = daemon.watch(host="127.0.0.1", port=port, ssl=False, username="u", password="p",
+                               idle_check=0.1)
+        daemon.start()
+        try:
+            self.assertTrue(wait_for(lambda: watcher.errors >= 1))
+            self.assertFalse(daemon.health()["imap"][0]["connected"])
+        finally:
+            daemon.stop(timeout=10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import threading
+import time
+import unittest
+
+from rate_control import (
+    BLOCKED,
+    STATUS_BLOCKED,
+    STATUS_NOT_FOUND,
+    STATUS_OK,
+    BlockedError,
+    RateController,
+    ThrottleInterrupted,
+    ThrottleTimeout,
+    looks_blocked,
+    process_with_requeue,
+    result_status,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_controller(clock: FakeClock, **kwargs) -> RateController:
+    return RateController(jitter=0.0, clock=clock, sleep=clock.sleep, **kwargs)
+
+
+class RateControllerTests(unittest.TestCase):
+    def test_aimd_adjusts_rate(self) -> None:
+        ctrl = make_controller(FakeClock(), rate=1.0, increase=0.1, decrease=0.5)
+        ctrl.record_failure()
+        self.assertAlmostEqual(ctrl.rate, 0.5)
+        ctrl.record_success()
+        self.assertAlmostEqual(ctrl.rate, 0.6)
+
+    def test_wait_spaces_requests_by_interval(self) -> None:
+        clock = FakeClock()
+        ctrl = make_controller(clock, rate=0.5)
+        ctrl.wait()
+        ctrl.wait()
+        self.assertEqual(clock.sleeps, [2.0])
+
+    def test_circuit_opens_after_threshold(self) -> None:
+        clock = FakeClock()
+        ctrl = make_controller(clock, failure_threshold=2, cooldown=30.0)
+        ctrl.record_failure()
+        self.assertFalse(ctrl.circuit_open)
+        ctrl.record_failure()
+        self.assertTrue(ctrl.circuit_open)
+        ctrl.wait()
+        self.assertGreaterEqual(clock.now, 30.0)
+        self.assertFalse(ctrl.circuit_open)
+
+    def test_results_are_recorded_while_another_thread_waits(self) -> None:
+        ctrl = RateController(jitter=0.0, failure_threshold=1, cooldown=3.0)
+        ctrl.record_failure()
+        outcome: list[BaseException] = []
+
+        def wait() -> None:
+            try:
+                ctrl.wait()
+            except BaseException as e:
+                outcome.append(e)
+
+        waiter = threading.Thread(target=wait)
+        waiter.start()
+        time.sleep(0.1)
+        started = time.monotonic()
+        ctrl.record_success()
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertFalse(ctrl.circuit_open)
+        ctrl.interrupt()
+        waiter.join(timeout=1)
+        self.assertFalse(waiter.is_alive())
+        self.assertIsInstance(outcome[0], ThrottleInterrupted)
+
+    def test_concurrent_waits_reserve_distinct_slots(self) -> None:
+        clock = FakeClock()
+        ctrl = make_controller(clock, rate=0.5)
+        ctrl.wait()
+        ctrl._sleep = lambda seconds: clock.sleeps.append(seconds)  # l'horloge n'avance pas
+        ctrl.wait()
+        ctrl.wait()
+        self.assertEqual(clock.sleeps, [2.0, 4.0])
+
+    def test_looks_blocked(self) -> None:
+        self.assertTrue(looks_blocked("<div class='anomaly-modal__title'>"))
+        self.assertFalse(looks_blocked("<html><body>Résultats</body></html>"))
+        self.assertFalse(looks_blocked(None))
+
+
+class ProcessWithRequeueTests(unittest.TestCase):
+    def test_blocked_items_are_requeued(self) -> None:
+        clock = FakeClock()
+        ctrl = make_controller(clock, failure_threshold=10)
+        calls: list[str] = []
+
+        def func(item: str) -> str:
+            calls.append(item)
+            if item == "b" and calls.count("b") == 1:
+                raise BlockedError("challenge")
+            return item.upper()
+
+        self.assertEqual(process_with_requeue(["a", "b", "c"], func, ctrl), ["A", "B", "C"])
+        self.assertEqual(calls, ["a", "b", "c", "b"])
+
+    def test_gives_up_after_max_attempts(self) -> None:
+        clock = FakeClock()
+        ctrl = make_controller(clock, failure_threshold=10)
+
+        def func(item: str) -> str:
+            raise ThrottleTimeout("timeout")
+
+        self.assertEqual(process_with_requeue(["a"], func, ctrl, max_attempts=2), [BLOCKED])
+
+    def test_status_tells_blocked_from_not_found(self) -> None:
+        clock = FakeClock()
+        ctrl = make_controller(clock, failure_threshold=10)
+
+        def func(item: str) -> str | None:
+            if item == "blocked":
+                raise BlockedError("challenge")
+            return None if item == "missing" else item
+
+        results = process_with_requeue(["found", "missing", "blocked"], func, ctrl, max_attempts=2)
+        self.assertEqual(
+            [result_status(r) for r in results], [STATUS_OK, STATUS_NOT_FOUND, STATUS_BLOCKED]
+        )
+        self.assertFalse(results[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from email_jobup_reader import extract_from_html
+from snapshot_store import SnapshotStore, save_snapshot
+
+URL = "https://www.jobup.ch/fr/emplois/detail/0b6f6b1a-1234-4abc-9def-0123456789ab/"
+
+OFFER_HTML = """<html><head>
+<meta property="og:site_name" content="jobup.ch">
+</head><body>
+<div data-cy="company-information"><h2>  Acme
+  SA </h2></div>
+<section id="contact"><span class="contact-name">Jane Doe</span></section>
+<a href="tel:+41221234567"></a>
+</body></html>"""
+
+
+def at(day: int) -> datetime:
+    return datetime(2026, 10, day, 8, 0, tzinfo=timezone.utc)
+
+
+class SnapshotStoreTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = SnapshotStore(self.tmp.name)
+
+    def test_identical_pages_are_stored_once(self) -> None:
+        a = self.store.put(URL, OFFER_HTML, fetched_at=at(1))
+        b = self.store.put(URL, OFFER_HTML, fetched_at=at(2))
+        self.assertEqual(a.sha256, b.sha256)
+        objects = [f for _, _, files in os.walk(os.path.join(self.tmp.name, "objects")) for f in files]
+        self.assertEqual(len(objects), 1)
+        self.assertEqual(self.store.get(a.sha256), OFFER_HTML)
+        self.assertEqual(len(list(self.store.iter_index())), 2)
+
+    def test_latest_keeps_most_recent_fetch_per_url(self) -> None:
+        self.store.put(URL, "<p>old</p>", meta={"Titre Offre": "Dev"}, fetched_at=at(1))
+        new = self.store.put(URL, "<p>new</p>", meta={"Titre Offre": "Dev"}, fetched_at=at(3))
+        self.store.put("https://duckduckgo.com/?q=acme", "<p>s</p>", kind="search", fetched_at=at(2))
+        latest = self.store.latest("offer")
+        self.assertEqual([s.sha256 for s in latest], [new.sha256])
+        self.assertEqual(latest[0].meta, {"Titre Offre": "Dev"})
+        self.assertEqual(self.store.latest("offer", since="2026-10-04"), [])
+
+    def test_truncated_index_line_is_skipped(self) -> None:
+        self.store.put(URL, OFFER_HTML, fetched_at=at(1))
+        with open(self.store.index_path, "a", encoding="utf-8") as f:
+            f.write('{"url": "https://www.jobup')
+        self.assertEqual(len(self.store.latest()), 1)
+
+    def test_search_pages_are_opt_in(self) -> None:
+        with mock.patch.dict(os.environ, {"SNAPSHOT_DIR": self.tmp.name, "SNAPSHOTS": "1"}), \
+                mock.patch("snapshot_store._STORE", None):
+            os.environ.pop("SNAPSHOT_SEARCH", None)
+            self.assertIsNone(save_snapshot("https://duckduckgo.com/?q=a", "<p/>", "search"))
+            os.environ["SNAPSHOT_SEARCH"] = "1"
+            self.assertIsNotNone(save_snapshot("https://duckduckgo.com/?q=a", "<p/>", "search"))
+
+
+class ExtractFromHtmlTests(unittest.TestCase):
+    def test_extracts_company_contact_and_phone(self) -> None:
+        self.assertEqual(
+            extract_from_html(OFFER_HTML),
+            {
+                "Contact Offre": "Jane Doe",
+                "Téléphone Offre": "+41221234567",
+                "Entreprise (scrapée)": "Acme SA",
+            },
+        )
+
+    def test_falls_back_to_meta_for_company(self) -> None:
+        html = '<html><head><meta property="og:title" content="Acme Jobs"></head><body></body></html>'
+        details = extract_from_html(html)
+        self.assertEqual(details["Entreprise (scrapée)"], "Acme Jobs")
+        self.assertIsNone(details["Contact Offre"])
+        self.assertIsNone(details["Téléphone Offre"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import json
+import os
+import stat
+import sys
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+import update_chromedriver
+
+
+@unittest.skipIf(sys.platform == "win32", "uses a POSIX shell script as fake Chrome")
+class ProvisionTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        chrome = Path(self.tmp.name, "fake-chrome")
+        chrome.write_text("#!/bin/sh\necho 'Google Chrome 127.0.6533.88'\n")
+        chrome.chmod(chrome.stat().st_mode | stat.S_IXUSR)
+        env = mock.patch.dict(os.environ, {"CHROME_BINARY": str(chrome)})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def tearDown(self) -> None:
+        os.chdir(self.old_cwd)
+        self.tmp.cleanup()
+
+    def write_driver(self, version: str) -> str:
+        driver = Path("chromedriver", "chromedriver-linux64", "chromedriver")
+        driver.parent.mkdir(parents=True)
+        driver.write_bytes(b"driver")
+        path = str(driver.resolve())
+        update_chromedriver.save_manifest({
+            "driver_version": version,
+            "driver_path": path,
+            "driver_sha256": update_chromedriver.sha256_file(path),
+        })
+        return path
+
+    def test_matching_driver_skips_download(self) -> None:
+        path = self.write_driver("127.0.6533.99")
+        with mock.patch.object(update_chromedriver, "get_chromedriver_download") as download:
+            self.assertEqual(update_chromedriver.provision(), path)
+        download.assert_not_called()
+        manifest = json.loads(Path(update_chromedriver.MANIFEST).read_text())
+        self.assertEqual(manifest["chrome_version"], "127.0.6533.88")
+
+    def test_version_mismatch_triggers_download(self) -> None:
+        self.write_driver("126.0.6478.126")
+        with mock.patch.object(
+            update_chromedriver, "get_chromedriver_download", side_effect=RuntimeError("network")
+        ) as download:
+            with self.assertRaises(RuntimeError):
+                update_chromedriver.provision()
+        download.assert_called_once_with("127.0.6533.88")
+
+    def test_tampered_driver_is_not_trusted(self) -> None:
+        path = self.write_driver("127.0.6533.99")
+        Path(path).write_bytes(b"something else")
+        manifest = update_chromedriver.load_manifest()
+        self.assertIsNone(update_chromedriver.installed_driver_version(manifest))
+
+
+class ExtractDriverTests(unittest.TestCase):
+    def test_extracts_executable_driver(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = Path(tmp, "driver.zip")
+            with zipfile.ZipFile(archive, "w") as z:
+                z.writestr("chromedriver-linux64/LICENSE.chromedriver", "license")
+                z.writestr("chromedriver-linux64/chromedriver", "binary")
+            path = update_chromedriver.extract_driver(archive, Path(tmp, "out"))
+            self.assertEqual(Path(path).read_text(), "binary")
+            self.assertTrue(os.access(path, os.X_OK))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+
+import pandas as pd
+
+from url_canon import (
+    canonical_linkedin_url,
+    canonical_offer_url,
+    canonical_url,
+    canonicalize_series,
+)
+
+OFFER_ID = "0b6f6b1a-1234-4abc-9def-0123456789ab"
+
+
+class CanonicalOfferUrlTests(unittest.TestCase):
+    def test_locale_and_tracking_params_are_dropped(self) -> None:
+        expected = f"https://www.jobup.ch/fr/emplois/detail/{OFFER_ID}/"
+        for url in (
+            f"https://www.jobup.ch/fr/emplois/detail/{OFFER_ID}/?utm_source=alert&utm_medium=email",
+            f"https://jobup.ch/de/stellenangebote/detail/{OFFER_ID.upper()}",
+            f" https://www.jobup.ch/en/jobs/detail/{OFFER_ID}/?source=jobalert#apply ",
+        ):
+            self.assertEqual(canonical_offer_url(url), expected)
+
+    def test_other_jobup_pages_keep_meaningful_query(self) -> None:
+        self.assertEqual(
+            canonical_offer_url("https://www.jobup.ch/fr/emplois/?utm_campaign=x&term=dev"),
+            "https://www.jobup.ch/fr/emplois/?term=dev",
+        )
+
+    def test_look_alike_hosts_are_not_jobup(self) -> None:
+        for url in (
+            f"https://evil-jobup.ch/fr/emplois/detail/{OFFER_ID}/",
+            f"https://www.jobup.ch.evil.com/fr/emplois/detail/{OFFER_ID}/",
+            f"https://www.jobup.ch@evil.com/fr/emplois/detail/{OFFER_ID}/",
+        ):
+            self.assertEqual(canonical_offer_url(url), url)
+        self.assertEqual(
+            canonical_offer_url(f"https://WWW.JOBUP.CH:443/fr/emplois/detail/{OFFER_ID}/"),
+            f"https://www.jobup.ch/fr/emplois/detail/{OFFER_ID}/",
+        )
+
+class CanonicalLinkedInUrlTests(unittest.TestCase):
+    def test_company_and_profile_urls(self) -> None:
+        self.assertEqual(
+            canonical_linkedin_url("ch.linkedin.com/company/acme-labs/about/?trk=x"),
+            "https://www.linkedin.com/company/acme-labs",
+        )
+        self.assertEqual(
+            canonical_linkedin_url("https://www.linkedin.com/in/jane-doe-42a19b/"),
+            "https://www.linkedin.com/in/jane-doe-42a19b",
+        )
+
+    def test_look_alike_hosts_are_not_linkedin(self) -> None:
+        for url in ("https://notlinkedin.com/company/acme", "https://linkedin.com.evil.io/in/jane"):
+            self.assertEqual(canonical_linkedin_url(url), url)
+            self.assertEqual(canonical_url(url), url)
+
+    def test_duckduckgo_redirect_is_resolved(self) -> None:
+        href = "https://duckduckgo.com/l/?uddg=https%3A%2F%2Fwww.linkedin.com%2Fcompany%2Facme-labs%2F%3Ftrk%3Dpublic"
+        self.assertEqual(canonical_url(href), "https://www.linkedin.com/company/acme-labs")
+        self.assertIsNone(canonical_url(None))
+
+
+class CanonicalizeSeriesTests(unittest.TestCase):
+    def test_series_matches_scalar_and_handles_missing(self) -> None:
+        series = pd.Series([
+            "https://linkedin.com/in/jane-doe?utm_source=duckduckgo",
+            None,
+            "  ",
+            "https://linkedin.com/in/jane-doe?utm_source=duckduckgo",
+        ])
+        self.assertEqual(
+            canonicalize_series(series, "linkedin").tolist(),
+            ["https://www.linkedin.com/in/jane-doe", None, None, "https://www.linkedin.com/in/jane-doe"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
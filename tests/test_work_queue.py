@@ -0,0 +1,202 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import run_pipeline
+from excel_export import read_export
+from rate_control import BlockedError, RateController
+from work_queue import RetryLater, WorkQueue, batched, run_worker
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class WorkQueueTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.clock = FakeClock()
+        self.queue = WorkQueue(
+            os.path.join(self.tmp.name, "queue.sqlite3"),
+            lease_seconds=60,
+            max_attempts=2,
+            clock=self.clock,
+        )
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_enqueue_is_idempotent_per_key(self) -> None:
+        self.assertTrue(self.queue.enqueue("offer", "https://www.jobup.ch/a", {"n": 1}))
+        self.assertFalse(self.queue.enqueue("offer", "https://www.jobup.ch/a", {"n": 2}))
+        self.assertEqual(self.queue.counts(), {"pending": 1})
+
+    def test_leased_job_is_invisible_until_expiry(self) -> None:
+        self.queue.enqueue("offer", "a", {})
+        job = self.queue.claim("w1")
+        self.assertIsNotNone(job)
+        self.assertIsNone(self.queue.claim("w2"))
+
+        self.clock.now += 61
+        stolen = self.queue.claim("w2")
+        self.assertEqual(stolen.id, job.id)
+        self.assertFalse(self.queue.complete(job, "w1", {"by": "w1"}))
+        self.assertTrue(self.queue.complete(stolen, "w2", {"by": "w2"}))
+        self.assertEqual(list(self.queue.results("offer")), [("a", {"by": "w2"})])
+
+    def test_heartbeat_extends_lease(self) -> None:
+        self.queue.enqueue("offer", "a", {})
+        job = self.queue.claim("w1")
+        self.clock.now += 50
+        self.assertTrue(self.queue.heartbeat(job, "w1"))
+        self.clock.now += 50
+        self.assertIsNone(self.queue.claim("w2"))
+
+    def test_complete_enqueues_follow_ups(self) -> None:
+        self.queue.enqueue("offer", "a", {})
+        job = self.queue.claim("w1", ["offer"])
+        self.queue.complete(job, "w1", {"x": 1}, [("company", "a", {"x": 1})])
+        follow = self.queue.claim("w1", ["company"])
+        self.assertEqual((follow.kind, follow.key, follow.payload), ("company", "a", {"x": 1}))
+
+    def test_fail_retries_then_gives_up(self) -> None:
+        self.queue.enqueue("offer", "a", {})
+        self.queue.fail(self.queue.claim("w1"), "w1", "boom")
+        self.assertEqual(self.queue.counts(), {"pending": 1})
+        self.queue.fail(self.queue.claim("w1"), "w1", "boom")
+        self.assertEqual(self.queue.counts(), {"failed": 1})
+        self.assertIsNone(self.queue.claim("w1"))
+
+    def test_release_does_not_use_up_an_attempt(self) -> None:
+        self.queue.enqueue("offer", "a", {})
+        for _ in range(3):
+            self.assertTrue(self.queue.release(self.queue.claim("w1"), "w1"))
+        self.assertEqual(self.queue.counts(), {"pending": 1})
+        self.assertEqual(self.queue.claim("w1").attempts, 1)
+
+    def test_release_with_delay_hides_the_job(self) -> None:
+        self.queue.enqueue("offer", "a", {})
+        self.queue.release(self.queue.claim("w1"), "w1", delay=30, error="BlockedError: challenge")
+        self.assertIsNone(self.queue.claim("w1"))
+        self.assertEqual(self.queue.pending(), 1)
+        self.clock.now += 31
+        self.assertEqual(self.queue.claim("w1").attempts, 1)
+
+    def test_throttled_jobs_are_deferred_not_failed(self) -> None:
+        self.queue.enqueue("company", "a", {"Entreprise (scrapée)": "Acme"})
+        ctrl = RateController(jitter=0, failure_threshold=1, cooldown=300, clock=self.clock, sleep=lambda s: None)
+        calls = []
+
+        def blocked(name: str) -> str:
+            calls.append(name)
+            raise BlockedError("challenge")
+
+        with mock.patch("rate_control.controller_for", return_value=ctrl):
+            for _ in range(3):  # plus que max_attempts
+                self.clock.now += ctrl.retry_after() + 1
+                shutdown = threading.Event()
+
+                def handler(payload: dict, shutdown: threading.Event = shutdown):
+                    shutdown.set()  # un seul travail par passage
+                    return run_pipeline._paced("duckduckgo.com", blocked, payload["Entreprise (scrapée)"])
+
+                run_worker(self.queue, {"company": handler}, worker_id="w1", shutdown=shutdown)
+                # Caché jusqu'à la fin de la pause du circuit
+                self.assertIsNone(self.queue.claim("w2"))
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(self.queue.counts(), {"pending": 1})
+        self.clock.now += ctrl.retry_after() + 1
+        self.assertEqual(self.queue.claim("w1").attempts, 1)
+
+    def test_retry_later_does_not_use_up_an_attempt(self) -> None:
+        self.queue.enqueue("offer", "a", {})
+        shutdown = threading.Event()
+        calls = []
+
+        def throttled(payload: dict):
+            calls.append(payload)
+            if len(calls) == 3:
+                shutdown.set()
+            raise RetryLater("rate limited")
+
+        run_worker(self.queue, {"offer": throttled}, worker_id="w1", poll_interval=0, shutdown=shutdown)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(self.queue.counts(), {"pending": 1})
+
+    def test_collect_exports_failed_rows_with_status(self) -> None:
+        self.queue.enqueue("offer", "a", {"URL Offre": "a"})
+        self.queue.enqueue("offer", "b", {"URL Offre": "b"})
+        self.queue.complete(self.queue.claim("w1"), "w1", {"URL Offre": "a", "Contact Offre": "Jane"},
+                            [("company", "a", {"URL Offre": "a", "Contact Offre": "Jane"})])
+        for _ in range(2):
+            self.queue.fail(self.queue.claim("w1", ["offer"]), "w1", "RuntimeError: boom")
+        self.queue.complete(self.queue.claim("w1", ["company"]), "w1", {"URL Offre": "a", "Contact Offre": "Jane",
+                                                                        "LinkedIn Company URL": None})
+        output = os.path.join(self.tmp.name, "out.xlsx")
+        self.assertEqual(run_pipeline.collect_results(self.queue, output), 2)
+        df = read_export(output).set_index("URL Offre")
+        self.assertEqual(list(df.columns[-2:]), ["Statut", "Erreur"])
+        self.assertEqual(df.loc["a", "Statut"], "ok")
+        self.assertEqual((df.loc["b", "Statut"], df.loc["b", "Erreur"]), ("échec: offer", "RuntimeError: boom"))
+
+    def test_run_worker_gives_job_back_when_failing_during_shutdown(self) -> None:
+        self.queue.enqueue("offer", "a", {})
+        shutdown = threading.Event()
+
+        def interrupted(payload: dict):
+            shutdown.set()
+            raise RuntimeError("interrompu")
+
+        run_worker(self.queue, {"offer": interrupted}, worker_id="w1", shutdown=shutdown)
+        self.assertEqual(self.queue.counts(), {"pending": 1})
+        self.assertEqual(self.queue.claim("w1").attempts, 1)
+
+    def test_batched_handler_gets_available_jobs_of_its_kind(self) -> None:
+        for key in "abcde":
+            self.queue.enqueue("enrich", key, {"k": key})
+        self.queue.enqueue("offer", "z", {"k": "z"})
+        batches = []
+
+        @batched(3)
+        def enrich(payloads: list[dict]):
+            batches.append([p["k"] for p in payloads])
+            return [({"k": p["k"].upper()}, []) for p in payloads]
+
+        handlers = {"enrich": enrich, "offer": lambda p: (p, [])}
+        processed = run_worker(self.queue, handlers, worker_id="w1", exit_when_idle=True)
+        self.assertEqual(processed, 6)
+        self.assertEqual(batches, [["a", "b", "c"], ["d", "e"]])
+        self.assertEqual([r for _, r in self.queue.results("enrich")], [{"k": k} for k in "ABCDE"])
+
+    def test_enrich_sends_one_bulk_request_per_batch(self) -> None:
+        rows = [{"URL Offre": k, "LinkedIn Profile URL": f"https://www.linkedin.com/in/{k}"} for k in "abc"]
+        for row in rows:
+            self.queue.enqueue("enrich", row["URL Offre"], row)
+        results = [{"custom": {"row": str(i)}, "contact": {"most_probable_email": f"{k}@acme.ch"}}
+                   for i, k in enumerate("abc")]
+        with mock.patch("fullenrich_scraper.send_bulk_enrichment", return_value="id") as send, \
+                mock.patch("fullenrich_scraper.retrieve_bulk_results", return_value=results) as poll:
+            run_worker(self.queue, {"enrich": run_pipeline.handle_enrich}, worker_id="w1", exit_when_idle=True)
+        send.assert_called_once_with([row["LinkedIn Profile URL"] for row in rows])
+        self.assertEqual(poll.call_count, 1)
+        self.assertEqual([r["Email (FE)"] for _, r in self.queue.results("enrich")], ["a@acme.ch", "b@acme.ch", "c@acme.ch"])
+
+    def test_run_worker_chains_stages(self) -> None:
+        self.queue.enqueue("offer", "a", {"v": 1})
+        handlers = {
+            "offer": lambda p: ({"v": p["v"] + 1}, [("company", "a", {"v": p["v"] + 1})]),
+            "company": lambda p: ({"v": p["v"] * 10}, []),
+        }
+        processed = run_worker(self.queue, handlers, worker_id="w1", exit_when_idle=True)
+        self.assertEqual(processed, 2)
+        self.assertEqual(list(self.queue.results("company")), [("a", {"v": 20})])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,23 @@
 
+import hashlib
+import json
+import os
 import platform
-import requests
+import re
+import shutil
+import stat
+import subprocess
+import tempfile
 import zipfile
-import os
-import io
 from pathlib import Path
 
+from utils import CHROMEDRIVER_MANIFEST, find_chromedriver_binary
+
 DEST_DIR = Path("chromedriver")
+MANIFEST = Path(CHROMEDRIVER_MANIFEST)
+CFT_BASE = "https://googlechromelabs.github.io/chrome-for-testing"
+VERSION_RE = re.compile(r"(\d+)\.(\d+)\.(\d+)\.(\d+)")
+CHUNK_SIZE = 1 << 16
 
 def get_platform_key():
     system = platform.system()
@@ -21,40 +32,234 @@ def get_platform_key():
     else:
         raise RuntimeError(f"Unsupported OS: {system} ({machine})")
 
-def get_latest_chromedriver_url():
-    api_url = "https://googlechromelabs.github.io/chrome-for-testing/last-known-good-versions-with-downloads.json"
+def find_chrome_binary() -> str | None:
+    """Return the path of the installed Google Chrome, if any."""
+    env_path = os.getenv("CHROME_BINARY")
+    if env_path and os.path.isfile(env_path):
+        return env_path
+    for name in ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome"):
+        found = shutil.which(name)
+        if found:
+            return found
+    candidates = [
+        "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+        os.path.expandvars(r"%ProgramFiles%\Google\Chrome\Application\chrome.exe"),
+        os.path.expandvars(r"%ProgramFiles(x86)%\Google\Chrome\Application\chrome.exe"),
+        os.path.expandvars(r"%LocalAppData%\Google\Chrome\Application\chrome.exe"),
+    ]
+    for cand in candidates:
+        if os.path.isfile(cand):
+            return cand
+    return None
+
+def _parse_version(text: str) -> str | None:
+    m = VERSION_RE.search(text or "")
+    return m.group(0) if m else None
+
+def _build_of(version: str | None) -> str | None:
+    """Return the ``major.minor.build`` prefix ChromeDriver must match."""
+    return version.rsplit(".", 1)[0] if version else None
+
+def query_binary_version(binary: str) -> str | None:
+    """Return the version reported by ``binary --version`` (Chrome or driver)."""
+    if platform.system() == "Windows" and binary.lower().endswith("chrome.exe"):
+        # chrome.exe --version prints nothing on Windows: read the registry
+        try:
+            out = subprocess.run(
+                ["reg", "query", r"HKCU\Software\Google\Chrome\BLBeacon", "/v", "version"],
+                capture_output=True, text=True, timeout=10,
+            ).stdout
+            return _parse_version(out)
+        except (OSError, subprocess.SubprocessError):
+            return None
+    try:
+        out = subprocess.run([binary, "--version"], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return _parse_version(out)
+
+def load_manifest() -> dict:
+    try:
+        with open(MANIFEST, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(data: dict) -> None:
+    MANIFEST.parent.mkdir(parents=True, exist_ok=True)
+    tmp = MANIFEST.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, MANIFEST)
+
+def _stat_key(path: str) -> list:
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def installed_chrome_version(manifest: dict) -> str | None:
+    """Return the installed Chrome version, cached by binary path and mtime."""
+    binary = find_chrome_binary()
+    if not binary:
+        return None
+    key = _stat_key(binary)
+    if manifest.get("chrome_binary") == binary and manifest.get("chrome_stat") == key:
+        return manifest.get("chrome_version")
+    version = query_binary_version(binary)
+    manifest.update(chrome_binary=binary, chrome_stat=key, chrome_version=version)
+    return version
+
+def installed_driver_version(manifest: dict) -> str | None:
+    """Return the version of the provisioned driver if it is intact on disk."""
+    path = manifest.get("driver_path")
+    if not path or not os.path.isfile(path):
+        return None
+    if manifest.get("driver_stat") != _stat_key(path):
+        # Binary replaced or modified outside of this script: re-verify
+        if sha256_file(path) != manifest.get("driver_sha256"):
+            return None
+        manifest["driver_stat"] = _stat_key(path)
+    return manifest.get("driver_version")
+
+def get_chromedriver_download(chrome_version: str | None) -> tuple[str, str]:
+    """Return ``(version, url)`` of the driver matching *chrome_version*.
+
+    Falls back to the latest Stable driver when Chrome is not installed or
+    its build is unknown to Chrome for Testing.
+    """
+    import requests
+
+    platform_key = get_platform_key()
+    build = _build_of(chrome_version)
+    if build:
+        response = requests.get(f"{CFT_BASE}/latest-patch-versions-per-build-with-downloads.json", timeout=30)
+        response.raise_for_status()
+        entry = response.json().get("builds", {}).get(build)
+        if entry:
+            for item in entry.get("downloads", {}).get("chromedriver", []):
+                if item["platform"] == platform_key:
+                    return entry["version"], item["url"]
+        print(f"⚠️  Aucun ChromeDriver publié pour Chrome {build}, repli sur Stable.")
+    return get_latest_chromedriver_download()
+
+def get_latest_chromedriver_download() -> tuple[str, str]:
+    import requests
+
+    api_url = f"{CFT_BASE}/last-known-good-versions-with-downloads.json"
     response = requests.get(api_url, timeout=30)
     response.raise_for_status()
     data = response.json()
 
     platform_key = get_platform_key()
-    downloads = data["channels"]["Stable"]["downloads"]["chromedriver"]
-    for item in downloads:
+    stable = data["channels"]["Stable"]
+    for item in stable["downloads"]["chromedriver"]:
         if item["platform"] == platform_key:
-            return item["url"]
+            return stable["version"], item["url"]
     raise RuntimeError(f"No matching ChromeDriver URL for platform {platform_key}")
 
-def download_and_extract_zip(url: str, extract_to: Path):
+def download_to_file(url: str, dest: Path, expected_sha256: str | None = None) -> str:
+    """Stream *url* to *dest* and return its SHA-256.
+
+    The size is checked against ``Content-Length`` and the digest against
+    *expected_sha256* when given; *dest* is removed on any mismatch.
+    """
+    import requests
+
     print(f"⬇️ Downloading: {url}")
-    response = requests.get(url, timeout=120)
-    response.raise_for_status()
-    extract_to.mkdir(parents=True, exist_ok=True)
-    with zipfile.ZipFile(io.BytesIO(response.content)) as z:
-        z.extractall(extract_to)
-    print(f"✅ Extracted into: {extract_to.resolve()}")
+    h = hashlib.sha256()
+    size = 0
+    with requests.get(url, stream=True, timeout=120) as response:
+        response.raise_for_status()
+        # Content-Length is the encoded size: only comparable without encoding
+        encoded = response.headers.get("Content-Encoding")
+        expected_size = 0 if encoded else int(response.headers.get("Content-Length") or 0)
+        with open(dest, "wb") as f:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+                h.update(chunk)
+                size += len(chunk)
+    digest = h.hexdigest()
+    if (expected_size and size != expected_size) or (expected_sha256 and digest != expected_sha256.lower()):
+        dest.unlink(missing_ok=True)
+        raise RuntimeError(f"Téléchargement corrompu ({size} octets, sha256 {digest}).")
+    return digest
+
+def extract_driver(zip_path: Path, extract_to: Path) -> str:
+    """Extract the chromedriver executable from *zip_path*; return its path."""
+    with zipfile.ZipFile(zip_path) as z:
+        bad = z.testzip()
+        if bad:
+            raise RuntimeError(f"Archive corrompue (CRC): {bad}")
+        members = [n for n in z.namelist() if Path(n).name in ("chromedriver", "chromedriver.exe")]
+        if not members:
+            raise RuntimeError("Aucun binaire chromedriver dans l'archive.")
+        extract_to.mkdir(parents=True, exist_ok=True)
+        target = extract_to / members[0]
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + ".part")
+        with z.open(members[0]) as src, open(tmp, "wb") as dst:
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+    os.chmod(tmp, os.stat(tmp).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    os.replace(tmp, target)
+    print(f"✅ Extracted into: {target.parent.resolve()}")
+    return str(target.resolve())
+
+def provision(force: bool = False) -> str:
+    """Make sure a ChromeDriver matching the installed Chrome is on disk.
+
+    Returns the driver path. Nothing is downloaded when the manifest already
+    records an intact driver of the right build, which only costs a couple of
+    ``stat`` calls.
+    """
+    manifest = load_manifest()
+    chrome_version = installed_chrome_version(manifest)
+    driver_version = installed_driver_version(manifest)
+    if (
+        not force
+        and driver_version
+        and (chrome_version is None or _build_of(driver_version) == _build_of(chrome_version))
+    ):
+        save_manifest(manifest)
+        print(f"✅ ChromeDriver {driver_version} à jour (Chrome {chrome_version or 'inconnu'}).")
+        return manifest["driver_path"]
+
+    version, url = get_chromedriver_download(chrome_version)
+    DEST_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(suffix=".zip", dir=DEST_DIR)
+    os.close(fd)
+    zip_path = Path(tmp_name)
+    try:
+        zip_sha = download_to_file(url, zip_path, os.getenv("CHROMEDRIVER_SHA256"))
+        driver_path = extract_driver(zip_path, DEST_DIR)
+    finally:
+        zip_path.unlink(missing_ok=True)
+    manifest.update(
+        driver_version=version,
+        driver_path=driver_path,
+        driver_url=url,
+        zip_sha256=zip_sha,
+        driver_sha256=sha256_file(driver_path),
+        driver_stat=_stat_key(driver_path),
+    )
+    save_manifest(manifest)
+    return driver_path
 
 def main():
     try:
-        url = get_latest_chromedriver_url()
-        download_and_extract_zip(url, DEST_DIR)
-        # Print a hint path for convenience
-        # Try to find a binary path for scripting
-        import glob
-        candidates = glob.glob(str(DEST_DIR / "**" / "chromedriver*"), recursive=True)
-        if candidates:
-            print(f"🔎 Candidate binary: {os.path.abspath(candidates[0])}")
+        path = provision(force=os.getenv("CHROMEDRIVER_FORCE") == "1")
+        print(f"🔎 Binary: {path}")
     except Exception as e:
         print(f"❌ Error: {e}")
+        # Un driver existant reste utilisable si le réseau est indisponible
+        existing = find_chromedriver_binary()
+        if existing:
+            print(f"↪️  ChromeDriver existant conservé: {existing}")
 
 if __name__ == "__main__":
     main()
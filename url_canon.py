@@ -0,0 +1,152 @@
+"""Canonical forms of the URLs handled by the pipeline.
+
+The canonical URL is the key used for dedup and caching across steps:
+
+* Jobup offers: ``https://www.jobup.ch/fr/emplois/detail/<uuid>/`` whatever
+  the locale prefix (``/de/``, ``/en/`` ...) and tracking parameters.
+* LinkedIn: ``https://www.linkedin.com/company/<slug>`` and
+  ``https://www.linkedin.com/in/<slug>`` without country subdomain, query,
+  sub-pages or trailing slash.
+* DuckDuckGo ``/l/?uddg=`` redirects are resolved first.
+
+Scalar functions are memoized in a bounded LRU; :func:`canonicalize_series`
+canonicalizes a pandas column by computing each distinct value once.
+"""
+
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from utils import decode_duckduckgo_href
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+CACHE_SIZE = 1 << 16
+
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "mc_cid", "mc_eid", "ref", "refid", "source", "src",
+    "trk", "trackingid", "lipi", "originalsubdomain",
+}
+JOBUP_DETAIL_RE = re.compile(r"/detail/([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})", re.IGNORECASE)
+LINKEDIN_ENTITY_RE = re.compile(r"^/(company|in|school|showcase)/([^/]+)", re.IGNORECASE)
+
+
+def _split(url: str):
+    url = url.strip()
+    if not url:
+        return None
+    if "://" not in url:
+        url = "https://" + url
+    return urlsplit(url)
+
+
+def _on_domain(parts, domain: str) -> bool:
+    """Tell whether the host of *parts* is *domain* or one of its subdomains.
+
+    Uses ``hostname``, so credentials and ports in the netloc are ignored and
+    look-alikes such as ``evil-jobup.ch`` or ``jobup.ch.evil.com`` do not match.
+    """
+    host = parts.hostname or ""
+    return host == domain or host.endswith("." + domain)
+
+
+def _clean_query(query: str) -> str:
+    kept = [
+        (k, v) for k, v in parse_qsl(query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    ]
+    return urlencode(sorted(kept))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def resolve_redirect(href: str) -> str | None:
+    """Memoized :func:`utils.decode_duckduckgo_href`."""
+    return decode_duckduckgo_href(href)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def canonical_offer_url(url: str) -> str:
+    """Return the canonical form of a Jobup offer URL.
+
+    Offer detail pages are reduced to their UUID under the French locale;
+    other Jobup pages only lose their tracking parameters. Non-Jobup URLs
+    are returned stripped.
+    """
+    parts = _split(url)
+    if parts is None or not _on_domain(parts, "jobup.ch"):
+        return url.strip()
+    m = JOBUP_DETAIL_RE.search(parts.path)
+    if m:
+        return f"https://www.jobup.ch/fr/emplois/detail/{m.group(1).lower()}/"
+    return urlunsplit(("https", "www.jobup.ch", parts.path or "/", _clean_query(parts.query), ""))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def canonical_linkedin_url(url: str) -> str:
+    """Return the canonical form of a LinkedIn company or profile URL.
+
+    Non-LinkedIn URLs are returned stripped.
+    """
+    parts = _split(url)
+    if parts is None or not _on_domain(parts, "linkedin.com"):
+        return url.strip()
+    path = re.sub(r"/{2,}", "/", parts.path)
+    m = LINKEDIN_ENTITY_RE.match(path)
+    if m:
+        path = f"/{m.group(1).lower()}/{m.group(2)}"
+    return "https://www.linkedin.com" + path.rstrip("/")
+
+
+def canonical_url(url: str | None) -> str | None:
+    """Resolve DuckDuckGo redirects and canonicalize Jobup/LinkedIn URLs.
+
+    Any other URL keeps its path but loses fragment and tracking parameters.
+    Non-string or empty values yield ``None``.
+    """
+    if not isinstance(url, str):
+        return None
+    resolved = resolve_redirect(url)
+    if not resolved:
+        return None
+    return _canonical_resolved(resolved)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _canonical_resolved(url: str) -> str:
+    parts = _split(url)
+    if parts is None:
+        return url
+    if _on_domain(parts, "linkedin.com"):
+        return canonical_linkedin_url(url)
+    if _on_domain(parts, "jobup.ch"):
+        return canonical_offer_url(url)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, _clean_query(parts.query), ""))
+
+
+_SERIES_FUNCS = {
+    "offer": canonical_offer_url,
+    "linkedin": canonical_linkedin_url,
+    "any": canonical_url,
+}
+
+
+def canonicalize_series(series: "pd.Series", kind: str = "any") -> "pd.Series":
+    """Canonicalize a column of URLs (``kind`` is offer, linkedin or any).
+
+    Each distinct value is canonicalized once (hash-based ``unique``) and
+    the results are mapped back with a vectorized indexer, so a column with
+    many repeats costs one call per unique URL. Missing, empty and non-string
+    values become ``None``.
+    """
+    import pandas as pd
+
+    func = _SERIES_FUNCS[kind]
+    mapping = {
+        u: func(u.strip())
+        for u in pd.unique(series.dropna())
+        if isinstance(u, str) and u.strip()
+    }
+    out = series.map(mapping).astype(object)
+    return out.where(out.notna(), None)
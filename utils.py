@@ -1,5 +1,6 @@
 import os
 import glob
+import json
 import random
 import time
 from collections.abc import Iterable
@@ -24,18 +25,41 @@ def load_env_file(path: str = ".env") -> None:
             os.environ.setdefault(key.strip(), val.strip())
 
 
+CHROMEDRIVER_MANIFEST = os.path.join("chromedriver", "manifest.json")
+
+_chromedriver_path: str | None = None
+
+
 def find_chromedriver_binary() -> str | None:
     """Return path to chromedriver if found in common locations or PATH.
 
-    Searches environment hints, typical local folders, and system PATH for a
+    Searches environment hints, the manifest written by
+    ``update_chromedriver.py``, typical local folders, and system PATH for a
     ChromeDriver executable. Returns an absolute path if found, otherwise
-    ``None``.
+    ``None``. The result is cached for the lifetime of the process.
     """
+    global _chromedriver_path
+    if _chromedriver_path and os.path.isfile(_chromedriver_path):
+        return _chromedriver_path
+    _chromedriver_path = _locate_chromedriver()
+    return _chromedriver_path
+
+
+def _locate_chromedriver() -> str | None:
     # Environment variables sometimes specify an explicit path
     env_path = os.getenv("CHROMEDRIVER") or os.getenv("CHROMEDRIVER_PATH")
     if env_path and os.path.isfile(env_path):
         return os.path.abspath(env_path)
 
+    # Driver provisioned by update_chromedriver.py
+    try:
+        with open(CHROMEDRIVER_MANIFEST, "r", encoding="utf-8") as f:
+            manifest_path = json.load(f).get("driver_path")
+    except (OSError, ValueError):
+        manifest_path = None
+    if manifest_path and os.path.isfile(manifest_path):
+        return os.path.abspath(manifest_path)
+
     # Search in PATH
     path_bin = which("chromedriver")
     if path_bin:
@@ -127,6 +151,77 @@ def find_first_linkedin_url(
     return None
 
 
+def duckduckgo_has_no_results(page_source: str | None) -> bool:
+    """Return ``True`` if *page_source* is a DuckDuckGo "no results" page.
+
+    Used to tell a legitimately empty search apart from a page that never
+    finished loading.
+    """
+    if not isinstance(page_source, str):
+        return False
+    lowered = page_source.lower()
+    return any(
+        marker in lowered
+        for marker in ("no results found for", "aucun résultat", "keine ergebnisse")
+    )
+
+
+DUCKDUCKGO_RESULT_SELECTOR = "[data-testid='result-title-a'], a[href*='duckduckgo.com/l/?uddg=']"
+
+
+def search_duckduckgo(query: str, expected_substring: str) -> str | None:
+    """Return the first LinkedIn URL matching *expected_substring* for *query*.
+
+    Runs the search in a governed headless browser and snapshots the result
+    page. Returns ``None`` when DuckDuckGo reports no results; raises
+    ``BlockedError`` on a challenge page and ``ThrottleTimeout`` when the page
+    never loads, so callers can back off.
+    """
+    from selenium import webdriver
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    from browser_governor import get_governor
+    from rate_control import BlockedError, ThrottleTimeout, looks_blocked
+    from snapshot_store import save_snapshot
+
+    search_url = f"https://duckduckgo.com/?q={query.replace(' ', '+')}"
+    chromedriver_path = find_chromedriver_binary()
+    if not chromedriver_path:
+        raise RuntimeError("ChromeDriver introuvable. Exécute d'abord update_chromedriver.py")
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--lang=en-US")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    governor = get_governor()
+    driver = governor.acquire(options, chromedriver_path)
+    healthy = True
+    try:
+        try:
+            driver.get(search_url)
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, DUCKDUCKGO_RESULT_SELECTOR))
+            )
+        except TimeoutException:
+            source = driver.page_source
+            if looks_blocked(source):
+                raise BlockedError(f"DuckDuckGo challenge pour {query!r}")
+            if duckduckgo_has_no_results(source):
+                return None
+            raise ThrottleTimeout(f"DuckDuckGo sans réponse pour {query!r}")
+        save_snapshot(search_url, driver.page_source, "search", {"query": query})
+        links = driver.find_elements(By.CSS_SELECTOR, DUCKDUCKGO_RESULT_SELECTOR)
+        hrefs = [(a.get_attribute("href") or "") for a in links]
+        return find_first_linkedin_url(hrefs, expected_substring)
+    except BaseException:
+        healthy = False
+        raise
+    finally:
+        governor.release(driver, healthy)
+
+
 def polite_delay(a: float = 0.6, b: float = 1.4) -> None:
     """Sleep for a random duration between ``a`` and ``b`` seconds."""
     time.sleep(random.uniform(a, b))
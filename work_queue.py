@@ -0,0 +1,372 @@
+"""Lease-based job queue backed by SQLite, shared by several worker processes.
+
+The database can live on a volume shared between hosts. A worker *claims* a
+job, which leases it for ``lease_seconds``; while the job runs a background
+heartbeat keeps extending the lease. If the worker dies, the lease expires
+and the job becomes visible again to the other workers (visibility timeout).
+A handler raising :class:`RetryLater` (e.g. while the remote host throttles
+us) gives its job back without using up an attempt, hidden for a delay.
+Completing a job and enqueueing its follow-up jobs happen in the same
+transaction, and only the current lease holder may complete a job, so rows
+are neither lost nor processed twice.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+DEFAULT_QUEUE_PATH = "work_queue.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    updated REAL NOT NULL,
+    UNIQUE (kind, key)
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, kind, lease_expires);
+"""
+
+# (kind, key, payload) triples enqueued when a job completes
+FollowUp = tuple[str, str, dict]
+
+
+class RetryLater(RuntimeError):
+    """Raised by a handler to retry its job after *delay* seconds.
+
+    The attempt is not counted: use it for failures that say nothing about
+    the job itself, such as a rate limit or an open circuit breaker.
+    """
+
+    def __init__(self, message: str, delay: float = 0.0) -> None:
+        super().__init__(message)
+        self.delay = delay
+
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    key: str
+    payload: dict
+    attempts: int
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """Jobs table with leases, heartbeats and bounded retries.
+
+    Every call opens its own short-lived connection so the queue can be used
+    from the heartbeat thread and from several processes at once. The default
+    rollback journal is kept on purpose: WAL mode is unsafe on network file
+    systems.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_QUEUE_PATH,
+        lease_seconds: float = 120.0,
+        max_attempts: int = 3,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._clock = clock
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Yield a connection inside a write-locked transaction."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            if conn.in_transaction:
+                conn.execute("COMMIT")
+
+    def enqueue(self, kind: str, key: str, payload: dict) -> bool:
+        """Add a job unless one with the same *kind* and *key* already exists."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO jobs (kind, key, payload, updated) VALUES (?, ?, ?, ?)",
+                (kind, key, json.dumps(payload, default=str), self._clock()),
+            )
+            return cur.rowcount == 1
+
+    def claim(self, worker_id: str, kinds: Iterable[str] | None = None) -> Job | None:
+        """Lease the oldest available job of one of *kinds* to *worker_id*."""
+        jobs = self.claim_batch(worker_id, kinds, 1)
+        return jobs[0] if jobs else None
+
+    def claim_batch(self, worker_id: str, kinds: Iterable[str] | None = None, limit: int = 1) -> list[Job]:
+        """Lease the oldest available job of one of *kinds*, plus up to
+        ``limit - 1`` other available jobs of the same kind, to *worker_id*."""
+        now = self._clock()
+        kinds = list(kinds or [])
+        kind_filter = f"AND kind IN ({','.join('?' * len(kinds))})" if kinds else ""
+        with self._transaction() as conn:
+            # Jobs whose last lease expired on their final attempt are given up
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'lease expired', updated = ? "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            # Pending jobs may carry a "not before" time in lease_expires (see release)
+            visible = (
+                "SELECT id, kind, key, payload, attempts FROM jobs "
+                "WHERE ((status = 'pending' AND (lease_expires IS NULL OR lease_expires <= ?)) "
+                "OR (status = 'leased' AND lease_expires < ?)) "
+            )
+            first = conn.execute(
+                visible + f"{kind_filter} ORDER BY id LIMIT 1", (now, now, *kinds)
+            ).fetchone()
+            if first is None:
+                return []
+            rows = [first]
+            if limit > 1:
+                rows += conn.execute(
+                    visible + "AND kind = ? AND id != ? ORDER BY id LIMIT ?",
+                    (now, now, first["kind"], first["id"], limit - 1),
+                ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated = ? WHERE id = ?",
+                [(worker_id, now + self.lease_seconds, now, row["id"]) for row in rows],
+            )
+        return [
+            Job(row["id"], row["kind"], row["key"], json.loads(row["payload"]), row["attempts"] + 1)
+            for row in rows
+        ]
+
+    def heartbeat(self, job: Job, worker_id: str) -> bool:
+        """Extend the lease on *job*; ``False`` means the lease was lost."""
+        now = self._clock()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (now + self.lease_seconds, now, job.id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def complete(
+        self,
+        job: Job,
+        worker_id: str,
+        result: dict | None = None,
+        follow_ups: Iterable[FollowUp] = (),
+    ) -> bool:
+        """Store *result* and enqueue *follow_ups* atomically.
+
+        Returns ``False`` (and changes nothing) if *worker_id* no longer holds
+        the lease, e.g. because another worker reclaimed the job.
+        """
+        now = self._clock()
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_expires = NULL, "
+                "updated = ? WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (json.dumps(result, default=str), now, job.id, worker_id),
+            )
+            if cur.rowcount != 1:
+                return False
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (kind, key, payload, updated) VALUES (?, ?, ?, ?)",
+                [(kind, key, json.dumps(payload, default=str), now) for kind, key, payload in follow_ups],
+            )
+            return True
+
+    def fail(self, job: Job, worker_id: str, error: str) -> bool:
+        """Release *job* for a retry, or mark it failed after the last attempt."""
+        status = "failed" if job.attempts >= self.max_attempts else "pending"
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, lease_expires = NULL, "
+                "updated = ? WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (status, error, self._clock(), job.id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def release(self, job: Job, worker_id: str, delay: float = 0.0, error: str | None = None) -> bool:
+        """Give *job* back without using up an attempt (e.g. on shutdown).
+
+        The job stays invisible to :meth:`claim` for *delay* seconds.
+        """
+        now = self._clock()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'pending', attempts = attempts - 1, lease_owner = NULL, "
+                "lease_expires = ?, error = COALESCE(?, error), updated = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (now + delay if delay > 0 else None, error, now, job.id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def results(self, kind: str) -> Iterator[tuple[str, dict]]:
+        """Yield ``(key, result)`` for every completed job of *kind*."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT key, result FROM jobs WHERE kind = ? AND status = 'done' ORDER BY id",
+                (kind,),
+            ).fetchall()
+        for row in rows:
+            yield row["key"], json.loads(row["result"]) if row["result"] else {}
+
+    def failures(self, kind: str) -> Iterator[tuple[str, dict, str | None]]:
+        """Yield ``(key, payload, error)`` for every given-up job of *kind*."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT key, payload, error FROM jobs WHERE kind = ? AND status = 'failed' ORDER BY id",
+                (kind,),
+            ).fetchall()
+        for row in rows:
+            yield row["key"], json.loads(row["payload"]), row["error"]
+
+    def pending(self, kinds: Iterable[str] | None = None) -> int:
+        """Return the number of pending jobs of *kinds*, deferred ones included."""
+        kinds = list(kinds or [])
+        kind_filter = f"AND kind IN ({','.join('?' * len(kinds))})" if kinds else ""
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT COUNT(*) FROM jobs WHERE status = 'pending' {kind_filter}", kinds).fetchone()
+        return row[0]
+
+    def counts(self) -> dict[str, int]:
+        """Return the number of jobs per status."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+# A handler turns a job payload into (result, follow-up jobs)
+Handler = Callable[[dict], tuple[dict | None, list[FollowUp]]]
+
+
+def batched(size: int) -> Callable[[Callable], Callable]:
+    """Mark a handler as taking up to *size* payloads of its kind at once.
+
+    The decorated handler receives a list of payloads and returns one
+    ``(result, follow-ups)`` pair per payload, in the same order. The worker
+    only groups jobs that are available when it claims, so a lone job is
+    not held back waiting for company.
+    """
+    def mark(handler: Callable) -> Callable:
+        handler.batch_size = size
+        return handler
+    return mark
+
+
+def run_worker(
+    queue: WorkQueue,
+    handlers: dict[str, Handler],
+    worker_id: str | None = None,
+    exit_when_idle: bool = False,
+    poll_interval: float = 5.0,
+    shutdown: threading.Event | None = None,
+) -> int:
+    """Claim and run jobs until interrupted; returns the number processed.
+
+    Only kinds present in *handlers* are claimed. A heartbeat thread renews
+    the lease every third of ``queue.lease_seconds`` while a handler runs.
+    Handlers marked with :func:`batched` get several jobs of their kind at
+    once. Handler exceptions release the job for another attempt;
+    :class:`RetryLater` hides it for its delay without counting the attempt.
+    With *exit_when_idle* the worker returns once no job of its kinds is
+    pending, deferred ones included. Setting
+    *shutdown* stops the worker once its current job is finished; a job
+    whose handler fails while shutting down is given back without using up
+    an attempt.
+    """
+    worker_id = worker_id or default_worker_id()
+    shutdown = shutdown or threading.Event()
+    processed = 0
+    print(f"👷 Worker {worker_id} prêt ({', '.join(handlers)}).")
+    while not shutdown.is_set():
+        job = queue.claim(worker_id, handlers)
+        if job is None:
+            if exit_when_idle and not queue.pending(handlers):
+                return processed
+            shutdown.wait(poll_interval)
+            continue
+        handler = handlers[job.kind]
+        size = getattr(handler, "batch_size", 0)
+        jobs = [job]
+        if size > 1:
+            jobs += queue.claim_batch(worker_id, [job.kind], size - 1)
+        label = job.key if len(jobs) == 1 else f"{job.key} (+{len(jobs) - 1})"
+
+        stop = threading.Event()
+
+        def beat(jobs: list[Job] = jobs) -> None:
+            while not stop.wait(queue.lease_seconds / 3):
+                if not any([queue.heartbeat(j, worker_id) for j in jobs]):
+                    return
+
+        beater = threading.Thread(target=beat, daemon=True)
+        beater.start()
+        try:
+            if size:
+                outcomes = handler([j.payload for j in jobs])
+            else:
+                outcomes = [handler(job.payload)]
+        except RetryLater as e:
+            for j in jobs:
+                queue.release(j, worker_id, e.delay, f"{type(e).__name__}: {e}")
+            print(f"⏸  {job.kind} {label} reporté de {e.delay:.0f}s: {e}")
+            continue
+        except Exception as e:
+            if shutdown.is_set():
+                for j in jobs:
+                    queue.release(j, worker_id)
+                print(f"↩️  {job.kind} {label} remis en file (arrêt).")
+                continue
+            for j in jobs:
+                queue.fail(j, worker_id, f"{type(e).__name__}: {e}")
+            print(f"❌ {job.kind} {label}: {e}")
+            continue
+        finally:
+            stop.set()
+            beater.join()
+        for j, (result, follow_ups) in zip(jobs, outcomes):
+            if queue.complete(j, worker_id, result, follow_ups):
+                processed += 1
+                print(f"✅ {j.kind} {j.key}")
+            else:
+                print(f"⚠️  Bail perdu pour {j.kind} {j.key}, résultat ignoré.")
+    return processed
+
+
+def enqueue_all(queue: WorkQueue, kind: str, items: Iterable[tuple[str, Any]]) -> int:
+    """Enqueue ``(key, payload)`` pairs, returning how many were new."""
+    return sum(queue.enqueue(kind, key, payload) for key, payload in items)